@@ -0,0 +1,316 @@
+"""
+Admission Control
+Decides which chat requests run now, which wait, and which are turned away.
+
+Every agent run holds one of ADMISSION_MAX_RUNNING slots (LLM quota and
+worker threads are the scarce resources). When all slots are busy, requests
+wait in a queue, served by lane priority and then arrival order:
+
+- fast:  cheap requests that don't run the agent - never queued, only the
+         per-client limits apply
+- agent: interactive /api/chat requests - at most ADMISSION_MAX_QUEUE wait,
+         each for up to ADMISSION_QUEUE_TIMEOUT seconds
+- bulk:  the runs of /api/chat/batch - they only get a slot when no
+         interactive request is waiting. New batches are refused once
+         ADMISSION_MAX_BULK_QUEUE runs are waiting, and a run gives up after
+         ADMISSION_BULK_TIMEOUT seconds
+
+Each lane's queue bound only counts waiters of that lane and the lanes
+ahead of it, so waiting batch runs never make /api/chat look saturated.
+
+Each client also has a token-bucket rate limit and a cap on concurrent
+requests. Clients are identified by their address (behind a load balancer,
+set INFRA_CHAT_PROXY_COUNT so wsgi.py restores it from X-Forwarded-For).
+The X-Client-Id header is only honoured from ADMISSION_TRUSTED_CLIENTS -
+e.g. an authenticating gateway - since anyone else could pick a fresh id
+per request, or someone else's. Requests over a
+limit, or arriving to a full queue, are rejected right away with a
+Retry-After hint instead of piling up - so a burst sheds a few requests
+rather than making every request slow.
+
+Limits apply per process: with several gunicorn workers the total is
+workers x ADMISSION_MAX_RUNNING. A queued request still holds a server
+thread, so each worker needs more threads than running + queued requests
+(gunicorn.conf.py and serve.py size their thread pools that way).
+"""
+
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Configuration
+MAX_RUNNING = int(os.getenv("ADMISSION_MAX_RUNNING", "4"))
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "8"))
+QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "15"))
+MAX_BULK_QUEUE = int(os.getenv("ADMISSION_MAX_BULK_QUEUE", "16"))
+BULK_TIMEOUT = float(os.getenv("ADMISSION_BULK_TIMEOUT", "300"))
+
+CLIENT_MAX_CONCURRENT = int(os.getenv("CLIENT_MAX_CONCURRENT", "2"))
+CLIENT_RATE_PER_MINUTE = float(os.getenv("CLIENT_RATE_PER_MINUTE", "30"))
+CLIENT_BURST = int(os.getenv("CLIENT_BURST", "10"))
+
+# Addresses / networks allowed to name the client with X-Client-Id
+TRUSTED_CLIENTS = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("ADMISSION_TRUSTED_CLIENTS", "").split(",")
+    if entry.strip()
+]
+
+# Clients whose limiter state is kept (least recently seen are dropped first)
+MAX_TRACKED_CLIENTS = 10000
+
+# Lanes in priority order
+LANES = ("fast", "agent", "bulk")
+
+
+class AdmissionRejected(Exception):
+    """The request was not admitted; retry after `retry_after` seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(reason)
+
+
+class _ClientState:
+    def __init__(self, burst: int):
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+
+
+class _Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Global agent slots with a priority queue, plus per-client limits
+
+    Args:
+        max_running: Agent runs allowed at the same time
+        max_queue: Interactive requests allowed to wait for a slot
+        queue_timeout: Longest an interactive request waits (seconds)
+        max_bulk_queue: Waiting batch runs above which new batches are refused
+        bulk_timeout: Longest a batch run waits (seconds)
+        client_max_concurrent: Requests one client may have in progress
+        client_rate_per_minute: Sustained requests per minute per client
+        client_burst: Requests a client may send at once after being idle
+    """
+
+    def __init__(self, max_running: int = MAX_RUNNING, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT,
+                 max_bulk_queue: int = MAX_BULK_QUEUE, bulk_timeout: float = BULK_TIMEOUT,
+                 client_max_concurrent: int = CLIENT_MAX_CONCURRENT,
+                 client_rate_per_minute: float = CLIENT_RATE_PER_MINUTE,
+                 client_burst: int = CLIENT_BURST):
+        self.max_running = max_running
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.queue_limits = {"agent": max_queue, "bulk": max_bulk_queue}
+        self.queue_timeouts = {"agent": queue_timeout, "bulk": bulk_timeout}
+        self.client_max_concurrent = client_max_concurrent
+        self.client_rate = client_rate_per_minute / 60.0
+        self.client_burst = client_burst
+
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queues = {lane: deque() for lane in LANES}
+        self._clients = OrderedDict()
+        # Moving average of how long a slot is held, for Retry-After hints
+        self._avg_run_seconds = 5.0
+        self.rejected = 0
+
+    # --- Per-client limits ---
+
+    def _client(self, client_id: str) -> _ClientState:
+        state = self._clients.get(client_id)
+        if state is None:
+            state = self._clients[client_id] = _ClientState(self.client_burst)
+            while len(self._clients) > MAX_TRACKED_CLIENTS:
+                # Drop the least recently seen idle client
+                oldest = next((cid for cid, s in self._clients.items() if s.in_flight == 0), None)
+                if oldest is None:
+                    break
+                del self._clients[oldest]
+        else:
+            self._clients.move_to_end(client_id)
+        return state
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected += 1
+        return AdmissionRejected(reason, retry_after)
+
+    def acquire_client(self, client_id: str, cost: float = 1.0):
+        """
+        Count a request against a client's rate and concurrency limits
+
+        A request is admitted while the client has any tokens left, and
+        then charged its full cost - so a large batch is allowed, but the
+        client waits for the bucket to refill before sending more.
+
+        Raises:
+            AdmissionRejected: The client is over one of its limits
+        """
+        with self._lock:
+            state = self._client(client_id)
+            now = time.monotonic()
+            state.tokens = min(self.client_burst, state.tokens + (now - state.updated) * self.client_rate)
+            state.updated = now
+
+            if state.in_flight >= self.client_max_concurrent:
+                raise self._reject(
+                    f"Too many requests in progress (max {self.client_max_concurrent} per client)",
+                    self._avg_run_seconds
+                )
+            if state.tokens < 1.0:
+                raise self._reject(
+                    "Rate limit exceeded",
+                    (1.0 - state.tokens) / self.client_rate if self.client_rate else 60.0
+                )
+
+            state.tokens -= cost
+            state.in_flight += 1
+
+    def release_client(self, client_id: str):
+        with self._lock:
+            state = self._clients.get(client_id)
+            if state is not None and state.in_flight:
+                state.in_flight -= 1
+
+    # --- Agent slots ---
+
+    def _queued_ahead(self, lane: str) -> int:
+        """Waiters served no later than a new request in this lane"""
+        return sum(len(self._queues[other]) for other in LANES[:LANES.index(lane) + 1])
+
+    def _retry_hint(self, lane: str) -> float:
+        """Rough time until a newly queued request would get a slot"""
+        return self._avg_run_seconds * (self._queued_ahead(lane) + 1) / max(self.max_running, 1)
+
+    def _queue_full(self, lane: str) -> bool:
+        return (self._running >= self.max_running
+                and self._queued_ahead(lane) >= self.queue_limits[lane])
+
+    def check_capacity(self, lane: str = "agent"):
+        """
+        Reject early when a lane's queue is full
+
+        Raises:
+            AdmissionRejected: The server is saturated
+        """
+        with self._lock:
+            if self._queue_full(lane):
+                raise self._reject("Server busy, please retry", self._retry_hint(lane))
+
+    def acquire_slot(self, lane: str = "agent", timeout: float = None, queue_limit: bool = True):
+        """
+        Wait for an agent slot
+
+        Args:
+            lane: One of LANES
+            timeout: Longest wait in seconds (default: the lane's timeout)
+            queue_limit: Reject when the lane's queue is full (off for the
+                runs of an already admitted batch)
+
+        Raises:
+            AdmissionRejected: The queue is full or the wait timed out
+        """
+        if lane == "fast":
+            return
+        timeout = self.queue_timeouts[lane] if timeout is None else timeout
+
+        with self._lock:
+            if self._running < self.max_running and not self._queued_ahead(lane):
+                self._running += 1
+                return
+            if queue_limit and self._queue_full(lane):
+                raise self._reject("Server busy, please retry", self._retry_hint(lane))
+            waiter = _Waiter()
+            self._queues[lane].append(waiter)
+
+        waiter.event.wait(timeout)
+
+        with self._lock:
+            if waiter.granted:
+                return
+            self._queues[lane].remove(waiter)
+            raise self._reject("Timed out waiting for capacity", self._retry_hint(lane))
+
+    def release_slot(self, lane: str = "agent", run_seconds: float = None):
+        """Free a slot, handing it straight to the highest-priority waiter"""
+        if lane == "fast":
+            return
+        with self._lock:
+            if run_seconds is not None:
+                self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * run_seconds
+            for queue in self._queues.values():
+                if queue:
+                    waiter = queue.popleft()
+                    waiter.granted = True
+                    waiter.event.set()
+                    return
+            self._running -= 1
+
+    @contextmanager
+    def slot(self, lane: str = "agent", timeout: float = None, queue_limit: bool = True):
+        """Hold an agent slot for the duration of the block"""
+        self.acquire_slot(lane, timeout, queue_limit)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release_slot(lane, time.monotonic() - started)
+
+    @contextmanager
+    def request(self, client_id: str, lane: str = "agent", cost: float = 1.0):
+        """
+        Admit one request: client limits first, then an agent slot
+
+        Raises:
+            AdmissionRejected: Before the block runs, if the request is not admitted
+        """
+        self.acquire_client(client_id, cost)
+        try:
+            with self.slot(lane):
+                yield
+        finally:
+            self.release_client(client_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "max_running": self.max_running,
+                "queued": {lane: len(queue) for lane, queue in self._queues.items() if lane != "fast"},
+                "max_queue": self.queue_limits,
+                "rejected": self.rejected,
+            }
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_CLIENTS)
+
+
+def client_id_for(request) -> str:
+    """
+    Identify the client of a Flask request for per-client limits
+
+    The remote address, or X-Client-Id when the caller is one of
+    ADMISSION_TRUSTED_CLIENTS.
+    """
+    address = request.remote_addr or "unknown"
+    client_id = request.headers.get("X-Client-Id")
+    if client_id and TRUSTED_CLIENTS and _is_trusted(address):
+        return f"id:{client_id}"
+    return address
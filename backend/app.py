@@ -8,22 +8,36 @@ documentation and cloud infrastructure.
 import warnings
 warnings.filterwarnings('ignore', category=RuntimeWarning, module='numpy')
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
 from langchain.tools import Tool
 
+# Load environment variables (before the tools read their configuration)
+load_dotenv()
+
 # Import our custom tools
-from tools.doc_search import search_documentation
+from tools.doc_search import available_shards, search_documentation
 from tools.cloud_search import search_aws_resources
 from tools.google_search import google_search
+from conversation_memory import ConversationStore, cached_tool, current_session_id
+from shared_calls import BatchScope, current_batch, shared_tool
+from admission import AdmissionController, AdmissionRejected, client_id_for
 
-# Load environment variables
-load_dotenv()
+# Batch chat limits
+BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "50"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+
+# Agent slots, request queue and per-client limits
+admission = AdmissionController()
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -36,21 +50,27 @@ llm = ChatGoogleGenerativeAI(
     temperature=0.7
 )
 
+# Per-session conversation history and cached tool results
+# (tools are also shared between the runs of one batch request)
+conversation_store = ConversationStore()
+
 # Define tools for the AI agent
 tools = [
     Tool(
         name="DocumentSearch",
-        func=search_documentation,
-        description="""
+        func=cached_tool(conversation_store, "DocumentSearch", shared_tool("DocumentSearch", search_documentation)),
+        description=f"""
         Use this tool to search through the team's documentation and README files.
         Input should be a clear question or search query about documentation, 
         setup guides, troubleshooting steps, or any written team knowledge.
         Example: "find the deployment guide" or "how to setup the database"
+        To search only one team's docs, start the input with team:<name>
+        (teams: {', '.join(available_shards()) or 'none'}), e.g. "team:payments deployment guide"
         """
     ),
     Tool(
         name="CloudSearch",
-        func=search_aws_resources,
+        func=cached_tool(conversation_store, "CloudSearch", shared_tool("CloudSearch", search_aws_resources)),
         description="""
         Use this tool to get real-time information about AWS cloud infrastructure.
         You can query EC2 instances, S3 buckets, and other AWS resources.
@@ -60,7 +80,7 @@ tools = [
     ),
     Tool(
         name="GoogleSearch",
-        func=google_search,
+        func=cached_tool(conversation_store, "GoogleSearch", shared_tool("GoogleSearch", google_search)),
         description="""
         Use this tool for general web searches when the user asks about topics
         not covered in documentation or cloud infrastructure.
@@ -87,6 +107,11 @@ When answering questions:
 4. If you use multiple tools, synthesize the results clearly
 
 Always be helpful, concise, and provide actionable information.
+If the conversation below already contains the information you need (including
+tool results gathered earlier), use it instead of calling the tool again.
+
+Conversation so far:
+{chat_history}
 
 Question: {input}
 
@@ -104,16 +129,56 @@ agent_executor = AgentExecutor(
 )
 
 
+def run_agent(user_message: str, session_id: str = None) -> str:
+    """
+    Run the AI agent on one message
+    
+    Args:
+        user_message: The user's question or command
+        session_id: Conversation to continue (None for a one-off question)
+        
+    Returns:
+        The agent's answer
+    """
+    token = current_session_id.set(session_id)
+    try:
+        result = agent_executor.invoke({
+            "input": user_message,
+            "chat_history": conversation_store.render_context(session_id) if session_id else "(new conversation)"
+        })
+    finally:
+        current_session_id.reset(token)
+    response_text = result.get('output', 'I apologize, but I could not generate a response.')
+    
+    if session_id:
+        conversation_store.add_turn(session_id, user_message, response_text)
+    
+    return response_text
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
         "message": "Infra-Chat API is running",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "admission": admission.stats()
     })
 
 
+def too_many_requests(error: AdmissionRejected):
+    """429 response telling the client when to retry"""
+    response = jsonify({
+        "success": False,
+        "error": error.reason,
+        "retry_after": error.retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """
@@ -121,12 +186,17 @@ def chat():
     
     Expected JSON body:
     {
-        "message": "user's question or command"
+        "message": "user's question or command",
+        "session_id": "optional id returned by a previous call"
     }
     
+    Requests wait for a free agent slot; when the server is saturated or
+    the client is over its limits the answer is a 429 with Retry-After.
+    
     Returns:
     {
         "response": "AI assistant's response",
+        "session_id": "id to send with follow-up questions",
         "success": true/false
     }
     """
@@ -141,17 +211,32 @@ def chat():
                 "error": "No message provided"
             }), 400
         
+        session_id = data.get('session_id')
+        if session_id is not None and not (
+            isinstance(session_id, str) and len(session_id) <= 128
+        ):
+            return jsonify({
+                "success": False,
+                "error": "session_id must be a string of at most 128 characters"
+            }), 400
+        session_id = session_id or conversation_store.new_session_id()
+        
         # Process the message through the AI agent
         print(f"\n🤖 Processing: {user_message}")
         
-        result = agent_executor.invoke({"input": user_message})
-        response_text = result.get('output', 'I apologize, but I could not generate a response.')
+        try:
+            with admission.request(client_id_for(request), "agent"):
+                response_text = run_agent(user_message, session_id)
+        except AdmissionRejected as e:
+            print(f"🚦 Rejected: {e.reason}")
+            return too_many_requests(e)
         
         print(f"✅ Response generated: {response_text[:100]}...")
         
         return jsonify({
             "success": True,
-            "response": response_text
+            "response": response_text,
+            "session_id": session_id
         })
     
     except Exception as e:
@@ -162,6 +247,111 @@ def chat():
         }), 500
 
 
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Answer many messages in one request (e.g. scheduled health digests)
+    
+    Messages run through the agent concurrently (up to BATCH_MAX_CONCURRENCY).
+    Identical messages are answered once, and identical tool calls - the
+    same doc search, or the AWS DescribeInstances behind any EC2 question -
+    run once for the whole batch. The runs use the low-priority bulk lane,
+    so interactive /api/chat requests get agent slots first; the batch is
+    charged one rate-limit token per unique message.
+    
+    Expected JSON body:
+    {
+        "messages": ["question 1", "question 2", ...]
+    }
+    
+    Returns newline-delimited JSON, one line per message as it completes:
+    {"index": 0, "message": "question 1", "success": true, "response": "..."}
+    followed by a summary line:
+    {"done": true, "count": 2, "tool_calls": 3, "tool_calls_shared": 2}
+    """
+    data = request.get_json(silent=True) or {}
+    messages = data.get('messages')
+    
+    if not isinstance(messages, list) or not messages:
+        return jsonify({
+            "success": False,
+            "error": "No messages provided"
+        }), 400
+    
+    if len(messages) > BATCH_MAX_MESSAGES:
+        return jsonify({
+            "success": False,
+            "error": f"Too many messages (max {BATCH_MAX_MESSAGES})"
+        }), 400
+    
+    if not all(isinstance(message, str) and message.strip() for message in messages):
+        return jsonify({
+            "success": False,
+            "error": "Every message must be a non-empty string"
+        }), 400
+    
+    # Identical messages share one agent run
+    indexes_by_message = {}
+    for index, message in enumerate(messages):
+        indexes_by_message.setdefault(message.strip(), []).append(index)
+    
+    client_id = client_id_for(request)
+    try:
+        admission.check_capacity("bulk")
+        admission.acquire_client(client_id, cost=len(indexes_by_message))
+    except AdmissionRejected as e:
+        print(f"🚦 Rejected batch: {e.reason}")
+        return too_many_requests(e)
+    
+    scope = BatchScope()
+    cancelled = threading.Event()
+    print(f"\n📦 Batch: {len(messages)} messages ({len(indexes_by_message)} unique)")
+    
+    def run_bulk(message: str) -> str:
+        with admission.slot("bulk", queue_limit=False):
+            if cancelled.is_set():
+                raise RuntimeError("Batch cancelled")
+            return run_agent(message)
+    
+    def generate():
+        executor = ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY)
+        try:
+            token = current_batch.set(scope)
+            try:
+                # Each run gets a copy of this context, so it sees the batch scope
+                futures = {
+                    executor.submit(copy_context().run, run_bulk, message): message
+                    for message in indexes_by_message
+                }
+            finally:
+                current_batch.reset(token)
+            
+            for future in as_completed(futures):
+                message = futures[future]
+                try:
+                    result = {"success": True, "response": future.result()}
+                except Exception as e:
+                    print(f"❌ Batch error: {str(e)}")
+                    result = {"success": False, "error": str(e)}
+                for index in indexes_by_message[message]:
+                    yield json.dumps({"index": index, "message": messages[index], **result}) + "\n"
+            
+            yield json.dumps({
+                "done": True,
+                "count": len(messages),
+                "tool_calls": scope.calls_made,
+                "tool_calls_shared": scope.calls_shared
+            }) + "\n"
+        finally:
+            # Stop queued runs if the client went away
+            cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(lambda: admission.release_client(client_id))
+    return response
+
+
 @app.route('/api/upload', methods=['POST'])
 def upload_document():
     """
@@ -223,4 +413,5 @@ if __name__ == '__main__':
     print("📍 Running on http://localhost:5000")
     print("📚 Make sure you've run 'python ingest.py' first!")
     
-    app.run(debug=True, port=5000)
+    # Development server only - use 'python serve.py' in production
+    app.run(debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true', port=5000)
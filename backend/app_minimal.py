@@ -13,10 +13,15 @@ from pathlib import Path
 # Load environment variables
 load_dotenv()
 
+from admission import AdmissionController, AdmissionRejected, client_id_for
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
 
+# Keyword search is cheap, so requests use the fast lane (per-client limits only)
+admission = AdmissionController()
+
 # Load documentation index
 DOCS_INDEX = None
 DOCS_INDEX_PATH = Path("./docs_index.json")
@@ -71,6 +76,14 @@ def chat():
     Main chat endpoint - simplified version without AI agent
     Returns helpful responses based on documentation search
     """
+    try:
+        admission.acquire_client(client_id_for(request))
+    except AdmissionRejected as e:
+        response = jsonify({'error': e.reason, 'retry_after': e.retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    
     try:
         data = request.json
         user_message = data.get('message', '')
@@ -109,6 +122,9 @@ def chat():
             'error': str(e),
             'message': 'An error occurred processing your request'
         }), 500
+    
+    finally:
+        admission.release_client(client_id_for(request))
 
 if __name__ == '__main__':
     print("\n🚀 Starting Infra-Chat Backend (Minimal Mode)")
@@ -125,4 +141,5 @@ if __name__ == '__main__':
     print("=" * 60)
     print()
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only - use 'python serve.py' in production
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true')
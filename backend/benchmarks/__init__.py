@@ -0,0 +1,4 @@
+"""
+Benchmarks for Infra-Chat
+Run from the backend directory, e.g. `python -m benchmarks.bench_chat`
+"""
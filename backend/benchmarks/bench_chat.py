@@ -0,0 +1,248 @@
+"""
+Chat API Load Benchmark
+Drives /api/chat and /api/upload of app.py and app_minimal.py over real HTTP
+at several concurrency levels, with the Gemini LLM and embeddings replaced by
+deterministic local fakes (see benchmarks/fakes.py).
+
+Each app runs in its own server process, so the reported RSS is that app's
+alone (not the load generator's, nor the other app's).
+
+Reports p50/p95/p99 latency, requests per second, server RSS and the
+number of requests shed by admission control (HTTP 429). Latency and RPS
+only count successful responses, so instant 429s don't flatter them. Each
+load thread acts as its own client; admission limits (global and
+per-client) default to effectively off here - set ADMISSION_* / CLIENT_*
+to benchmark shedding behaviour.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_chat
+    python -m benchmarks.bench_chat --apps app --concurrency 1,8,32 --llm-latency 0.2
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.utils import current_rss_mb, latency_summary, print_table
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+QUESTIONS = [
+    "How do I deploy the application?",
+    "What are the troubleshooting steps for CORS errors?",
+    "list all EC2 instances",
+    "How do I set up AWS credentials?",
+    "show S3 buckets",
+    "what is kubernetes",
+]
+
+
+def load_app(name: str, aws_latency: float):
+    """
+    Import app.py or app_minimal.py with the fakes in place
+
+    For app.py the document search is pointed at an in-memory FAISS index
+    built from backend/docs with the fake embeddings, and CloudSearch at
+    fake AWS clients.
+    """
+    if name == "app_minimal":
+        import app_minimal
+        return app_minimal.app
+
+    import app
+    from langchain_community.vectorstores import FAISS
+    from benchmarks.fakes import install_fake_aws
+    import ingest
+    from retrieval import Shard
+    from tools import doc_search
+
+    documents = ingest.load_documents_from_directory(BACKEND_DIR / "docs")
+    chunks = ingest.split_documents(documents)
+    doc_search.shards = {"all": Shard("all", FAISS.from_documents(chunks, doc_search.embeddings))}
+    install_fake_aws(aws_latency)
+    app.agent_executor.verbose = False
+    return app.app
+
+
+def serve_app(name: str, port: int, aws_latency: float):
+    """Serve one app on 127.0.0.1:port until killed (runs in the child process)"""
+    flask_app = load_app(name, aws_latency)
+    make_server("127.0.0.1", port, flask_app, threaded=True).serve_forever()
+
+
+def start_app_process(name: str, args):
+    """
+    Start an app in a separate server process and wait until it answers
+
+    Returns:
+        (process, base_url)
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.bench_chat",
+            "--serve", name, "--port", str(port),
+            "--llm-latency", str(args.llm_latency),
+            "--embedding-latency", str(args.embedding_latency),
+            "--aws-latency", str(args.aws_latency),
+        ],
+        cwd=BACKEND_DIR,
+        # The apps log every request; keep that out of the results
+        stdout=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 300
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+
+    process.kill()
+    raise RuntimeError(f"{name} server did not start")
+
+
+def make_request(session, base_url: str, endpoint: str, i: int) -> int:
+    """Send one request and return the HTTP status code"""
+    if endpoint == "chat":
+        response = session.post(
+            f"{base_url}/api/chat",
+            json={"message": QUESTIONS[i % len(QUESTIONS)]},
+            headers={"X-Client-Id": f"bench-{threading.get_ident()}"},
+            timeout=120
+        )
+    else:
+        response = session.post(
+            f"{base_url}/api/upload",
+            files={"file": (f"note-{i}.md", f"# Note {i}\n\nSome runbook text.\n" * 20)},
+            timeout=120
+        )
+    return response.status_code
+
+
+def run_load(base_url: str, endpoint: str, concurrency: int, total: int) -> dict:
+    """Send `total` requests with `concurrency` parallel clients"""
+    local = threading.local()
+
+    def one(i):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            status = make_request(local.session, base_url, endpoint, i)
+        except requests.RequestException:
+            status = None
+        return time.perf_counter() - start, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    succeeded = [latency for latency, status in results if status and status < 400]
+    summary = latency_summary(succeeded, elapsed)
+    summary["requests"] = total
+    summary["ok"] = len(succeeded)
+    summary["rejected"] = sum(1 for _, status in results if status == 429)
+    summary["errors"] = total - summary["ok"] - summary["rejected"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Infra-Chat API with a stub LLM")
+    parser.add_argument("--apps", default="app,app_minimal", help="Comma-separated: app, app_minimal")
+    parser.add_argument("--endpoints", default="chat,upload", help="Comma-separated: chat, upload")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per run")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    parser.add_argument("--embedding-latency", type=float, default=0.01, help="Seconds per fake embedding call")
+    parser.add_argument("--aws-latency", type=float, default=0.02, help="Seconds per fake AWS call")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    # Internal: run one app as the server process
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    # Measure raw throughput unless admission limits are set explicitly.
+    # Each load thread sends its own X-Client-Id; trust it from localhost
+    for name, value in (("ADMISSION_MAX_RUNNING", "1000"), ("ADMISSION_MAX_QUEUE", "1000"),
+                        ("CLIENT_RATE_PER_MINUTE", "1000000"), ("CLIENT_BURST", "1000000"),
+                        ("CLIENT_MAX_CONCURRENT", "1000"), ("ADMISSION_TRUSTED_CLIENTS", "127.0.0.1")):
+        os.environ.setdefault(name, value)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    if args.serve:
+        if args.serve != "app_minimal":
+            # Imported here so app_minimal's process doesn't load LangChain
+            from benchmarks.fakes import install_fakes
+            install_fakes(args.llm_latency, args.embedding_latency)
+        # Per-request access logs would dominate the output (and the timings)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        serve_app(args.serve, args.port, args.aws_latency)
+        return
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    rows = []
+
+    for app_name in args.apps.split(","):
+        print(f"🚀 Starting {app_name}...")
+        process, base_url = start_app_process(app_name, args)
+
+        try:
+            for endpoint in args.endpoints.split(","):
+                if endpoint == "upload" and app_name == "app_minimal":
+                    continue  # app_minimal has no upload endpoint
+                for concurrency in levels:
+                    print(f"⏱️  {app_name} /api/{endpoint} @ concurrency {concurrency}...")
+                    row = run_load(base_url, endpoint, concurrency, args.requests)
+                    row.update(app=app_name, endpoint=endpoint, concurrency=concurrency,
+                               rss_mb=current_rss_mb(process.pid))
+                    rows.append(row)
+        finally:
+            process.terminate()
+            process.wait()
+
+    print()
+    print_table(rows, [
+        ("app", "app", "{}"),
+        ("endpoint", "endpoint", "{}"),
+        ("concurrency", "conc", "{}"),
+        ("requests", "reqs", "{}"),
+        ("ok", "ok", "{}"),
+        ("errors", "errors", "{}"),
+        ("rejected", "429s", "{}"),
+        ("rps", "rps", "{:.1f}"),
+        ("p50_ms", "p50 ms", "{:.1f}"),
+        ("p95_ms", "p95 ms", "{:.1f}"),
+        ("p99_ms", "p99 ms", "{:.1f}"),
+        ("rss_mb", "rss MB", "{:.0f}"),
+    ])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Retrieval Benchmark
+Compares the document search backends on a synthetic corpus of increasing
+size with labelled queries, using the deterministic local embeddings from
+benchmarks/fakes.py (no network).
+
+For each backend and corpus size it reports recall@k, MRR, mean / p95 query
+latency, index build time and index size on disk.
+
+Backends:
+    faiss       - FAISS flat (exact) vector search as used by tools/doc_search.py
+    faiss-ivf   - FAISS IVF index (see vector_index.py)
+    faiss-hnsw  - FAISS HNSW index
+    faiss-pq    - FAISS IVF-PQ index
+    hybrid      - FAISS flat + BM25 fused with reciprocal rank fusion, MMR reranked (retrieval.py)
+    hybrid-no-rerank - hybrid without the MMR reranking stage
+    sharded     - hybrid, one shard per team directory, all shards searched in parallel
+    sharded-filtered - as sharded, but each query filtered to its target team's shard
+    keyword     - substring matching as used by app_minimal.search_docs
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --sizes 100,1000,10000,100000 --queries 100
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fakes import FakeGeminiEmbeddings
+from benchmarks.utils import percentile, print_table
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+COMMON_WORDS = (
+    "the service deployment config server error instance cluster team "
+    "database network setup guide check run update restart log access "
+    "policy role bucket region version release build pipeline monitor"
+).split()
+
+QUERY_PREFIXES = ["how to fix", "what does", "where is", "why does", "steps for"]
+
+
+def _make_word(rng: random.Random) -> str:
+    syllables = ["ka", "lo", "mi", "ne", "su", "ta", "ri", "vo", "ze", "pu", "gra", "sen", "dor", "lin"]
+    return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+
+def generate_corpus(size: int, num_queries: int, seed: int = 42):
+    """
+    Build a synthetic corpus and labelled queries
+
+    Every chunk mixes common ops vocabulary with a few distinctive terms and
+    an identifier (error code / instance id). Each query targets one chunk
+    using some of its distinctive terms.
+
+    Args:
+        size: Number of chunks
+        num_queries: Number of labelled queries
+        seed: Random seed (corpus and queries are deterministic)
+
+    Returns:
+        (chunks, queries) where chunks is a list of {"id", "source", "text"}
+        and queries a list of {"query", "target", "shard"}
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted({_make_word(rng) for _ in range(max(2000, size // 2))})
+
+    chunks = []
+    for i in range(size):
+        distinctive = rng.sample(vocabulary, 5)
+        identifier = rng.choice([f"ERR-{rng.randint(1000, 99999)}", f"i-{rng.getrandbits(48):012x}"])
+        words = [rng.choice(COMMON_WORDS) for _ in range(50)] + distinctive + [identifier]
+        rng.shuffle(words)
+        chunks.append({
+            "id": f"chunk-{i}",
+            "source": f"team-{i % 20}/doc-{i // 10}.md",
+            "text": " ".join(words),
+            "terms": distinctive,
+            "identifier": identifier,
+        })
+
+    queries = []
+    for _ in range(num_queries):
+        target = rng.choice(chunks)
+        terms = rng.sample(target["terms"], 2)
+        if rng.random() < 0.5:
+            terms.append(target["identifier"])
+        queries.append({
+            "query": f"{rng.choice(QUERY_PREFIXES)} {' '.join(terms)}",
+            "target": target["id"],
+            "shard": target["source"].split("/")[0],
+        })
+
+    return chunks, queries
+
+
+def _dir_size(path: str) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def _as_documents(chunks):
+    from langchain.schema import Document
+
+    return [
+        Document(page_content=chunk["text"], metadata={"id": chunk["id"], "source": chunk["source"]})
+        for chunk in chunks
+    ]
+
+
+def faiss_backend(index_type: str, hybrid: bool = False, reranker: str = "mmr"):
+    """
+    FAISS index of the given type (see vector_index.py), searched like
+    tools/doc_search.py - fused with BM25 when `hybrid` is set
+    """
+    def build(chunks, k: int):
+        from lexical_index import BM25Index
+        from retrieval import hybrid_search
+        from vector_index import build_vector_store
+
+        vectorstore, _ = build_vector_store(_as_documents(chunks), FakeGeminiEmbeddings(), index_type)
+        bm25 = None
+        if hybrid:
+            doc_ids = list(vectorstore.index_to_docstore_id.values())
+            bm25 = BM25Index(doc_ids, [vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            vectorstore.save_local(tmp)
+            if bm25 is not None:
+                bm25.save(tmp)
+            size = _dir_size(tmp)
+
+        def search(query):
+            return [doc.metadata["id"] for doc in hybrid_search(vectorstore, bm25, query, k=k, reranker=reranker)]
+
+        return search, size
+
+    return build
+
+
+def sharded_backend(filtered: bool):
+    """
+    Hybrid FAISS + BM25 index with one shard per team directory (retrieval.py).
+    With `filtered`, each query is restricted to its target's team shard.
+    """
+    def build(chunks, k: int):
+        from lexical_index import BM25Index
+        from retrieval import Shard, search_index, shard_name
+        from vector_index import build_vector_store
+
+        groups = {}
+        for doc in _as_documents(chunks):
+            groups.setdefault(shard_name(doc.metadata["source"]), []).append(doc)
+
+        shards = {}
+        size = 0
+        for name, docs in groups.items():
+            vectorstore, _ = build_vector_store(docs, FakeGeminiEmbeddings(), "flat")
+            doc_ids = list(vectorstore.index_to_docstore_id.values())
+            bm25 = BM25Index(doc_ids, [vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids])
+            shards[name] = Shard(name, vectorstore, bm25)
+            with tempfile.TemporaryDirectory() as tmp:
+                vectorstore.save_local(tmp)
+                bm25.save(tmp)
+                size += _dir_size(tmp)
+
+        def search(query, shard=None):
+            filters = {"shard": [shard]} if filtered and shard else None
+            return [doc.metadata["id"] for doc in search_index(shards, query, k=k, filters=filters)]
+
+        return search, size
+
+    return build
+
+
+def build_keyword(chunks, k: int):
+    """Substring matching over a docs index, searched by app_minimal.search_docs"""
+    import app_minimal
+    from ingest_minimal import create_simple_index
+
+    index = create_simple_index([
+        {"content": chunk["text"], "source": chunk["source"], "file_name": chunk["id"], "file_type": ".md"}
+        for chunk in chunks
+    ])
+    app_minimal.DOCS_INDEX = index
+    size = len(json.dumps(index).encode("utf-8"))
+
+    def search(query):
+        # search_docs always returns at most 2 matches, regardless of k
+        return [match["source"] for match in (app_minimal.search_docs(query) or [])]
+
+    return search, size
+
+
+BACKENDS = {
+    "faiss": faiss_backend("flat"),
+    "faiss-ivf": faiss_backend("ivf"),
+    "faiss-hnsw": faiss_backend("hnsw"),
+    "faiss-pq": faiss_backend("pq"),
+    "hybrid": faiss_backend("flat", hybrid=True),
+    "hybrid-no-rerank": faiss_backend("flat", hybrid=True, reranker=None),
+    "sharded": sharded_backend(filtered=False),
+    "sharded-filtered": sharded_backend(filtered=True),
+    "keyword": build_keyword,
+}
+
+
+def evaluate(backend: str, chunks, queries, k: int) -> dict:
+    """Build one backend and run all the labelled queries against it"""
+    started = time.perf_counter()
+    search, index_size = BACKENDS[backend](chunks, k)
+    build_seconds = time.perf_counter() - started
+
+    hits = 0
+    reciprocal_ranks = 0.0
+    latencies = []
+    for item in queries:
+        started = time.perf_counter()
+        if backend.startswith("sharded"):
+            results = search(item["query"], item["shard"])[:k]
+        else:
+            results = search(item["query"])[:k]
+        latencies.append(time.perf_counter() - started)
+
+        if item["target"] in results:
+            hits += 1
+            reciprocal_ranks += 1.0 / (results.index(item["target"]) + 1)
+
+    return {
+        "backend": backend,
+        "chunks": len(chunks),
+        "recall": hits / len(queries),
+        "mrr": reciprocal_ranks / len(queries),
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "build_s": build_seconds,
+        "size_mb": index_size / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document search backends")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backend names")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated corpus sizes (chunks)")
+    parser.add_argument("--queries", type=int, default=200, help="Labelled queries per corpus")
+    parser.add_argument("--k", type=int, default=3, help="Results per query (recall@k)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    rows = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        chunks, queries = generate_corpus(size, args.queries, args.seed)
+        for backend in args.backends.split(","):
+            print(f"⏱️  {backend} @ {size} chunks...")
+            rows.append(evaluate(backend, chunks, queries, args.k))
+
+    print()
+    print_table(rows, [
+        ("backend", "backend", "{}"),
+        ("chunks", "chunks", "{}"),
+        ("recall", f"recall@{args.k}", "{:.3f}"),
+        ("mrr", "MRR", "{:.3f}"),
+        ("mean_ms", "mean ms", "{:.2f}"),
+        ("p95_ms", "p95 ms", "{:.2f}"),
+        ("build_s", "build s", "{:.2f}"),
+        ("size_mb", "size MB", "{:.2f}"),
+    ])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
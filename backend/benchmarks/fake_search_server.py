@@ -0,0 +1,127 @@
+"""
+Local stand-in for the Google Custom Search API.
+
+Serves `/customsearch/v1` with results that link to HTML pages on the same
+server, so tools/google_search.py (including page fetching) can run offline:
+
+    python -m benchmarks.fake_search_server --port 8099 --latency 0.3
+
+    GOOGLE_SEARCH_API_URL=http://127.0.0.1:8099/customsearch/v1
+    GOOGLE_SEARCH_API_KEY=fake
+    GOOGLE_SEARCH_ENGINE_ID=fake
+
+`start_server()` runs it in a background thread for use from benchmarks.
+"""
+
+import argparse
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Simulated latencies in seconds
+API_LATENCY = 0.0
+PAGE_LATENCY = 0.0
+
+
+class FakeSearchHandler(BaseHTTPRequestHandler):
+    """Answers search API queries and serves the result pages"""
+
+    # Keep-alive, so pooled client sessions can reuse connections
+    protocol_version = "HTTP/1.1"
+
+    # Counters, e.g. to check how many API calls the cache saved
+    api_calls = 0
+    page_calls = 0
+    _counter_lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/customsearch/v1":
+            self._search(parse_qs(url.query))
+        elif url.path.startswith("/pages/"):
+            self._page(url.path.rsplit("/", 1)[-1])
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def _search(self, params):
+        with self._counter_lock:
+            FakeSearchHandler.api_calls += 1
+        if API_LATENCY:
+            time.sleep(API_LATENCY)
+
+        query = params.get("q", [""])[0]
+        num = int(params.get("num", ["3"])[0])
+        host = f"http://{self.headers.get('Host')}"
+        items = [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "snippet": f"How to fix '{query}' - step {i + 1} of the troubleshooting guide.",
+                "link": f"{host}/pages/{i + 1}?q={query.replace(' ', '+')}",
+            }
+            for i in range(num)
+        ]
+        self._send(200, "application/json", json.dumps({"items": items}).encode("utf-8"))
+
+    def _page(self, page_id: str):
+        with self._counter_lock:
+            FakeSearchHandler.page_calls += 1
+        if PAGE_LATENCY:
+            time.sleep(PAGE_LATENCY)
+
+        body = f"""<html><head><title>Page {html.escape(page_id)}</title>
+<style>body {{ font-family: sans-serif; }}</style><script>var tracking = 1;</script></head>
+<body><nav>Home | Docs | Blog</nav>
+<h1>Troubleshooting guide, part {html.escape(page_id)}</h1>
+<p>Check the service logs first, then restart the failing pod.</p>
+<p>{"Background filler text. " * 200}</p>
+</body></html>"""
+        self._send(200, "text/html; charset=utf-8", body.encode("utf-8"))
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port: int = 0, api_latency: float = 0.0, page_latency: float = 0.0):
+    """
+    Start the fake search server in a background thread
+
+    Returns:
+        (server, api_url) - call server.shutdown() to stop it
+    """
+    global API_LATENCY, PAGE_LATENCY
+    API_LATENCY = api_latency
+    PAGE_LATENCY = page_latency
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeSearchHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/customsearch/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Google Custom Search API")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per search API call")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Seconds per result page")
+    args = parser.parse_args()
+
+    server, api_url = start_server(args.port, args.latency, args.page_latency)
+    print(f"🔎 Fake search API at {api_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Deterministic local stand-ins for the Gemini LLM, embeddings and AWS clients.
+
+`install_fakes()` swaps them into `langchain_google_genai` so that importing
+app.py / ingest.py / tools.doc_search afterwards uses the fakes instead of
+calling Google. Latency is configurable to mimic a remote model.
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.language_models.llms import LLM
+
+from embedding_backends import HashingEmbeddings
+
+# Simulated latencies in seconds (set by install_fakes)
+LLM_LATENCY = 0.0
+EMBEDDING_LATENCY = 0.0
+
+EMBEDDING_DIM = 256
+
+
+class FakeGeminiLLM(LLM):
+    """
+    ReAct-speaking fake LLM
+
+    The first step picks a tool from keywords in the question; once an
+    observation is in the scratchpad it returns a final answer built from it.
+    Accepts the same constructor arguments as ChatGoogleGenerativeAI.
+    """
+
+    model: str = "fake-gemini"
+    google_api_key: Optional[Any] = None
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _call(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+        if LLM_LATENCY:
+            time.sleep(LLM_LATENCY)
+
+        question = prompt.rsplit("Question:", 1)[-1].split("\n", 1)[0].strip()
+
+        if "Observation:" in prompt:
+            observation = prompt.rsplit("Observation:", 1)[-1].strip()
+            return (
+                "Thought: I now know the final answer\n"
+                f"Final Answer: {observation[:300]}"
+            )
+
+        lowered = question.lower()
+        if any(word in lowered for word in ("ec2", "instance", "s3", "bucket", "server")):
+            tool = "CloudSearch"
+        elif any(word in lowered for word in ("what is", "latest", "pricing")):
+            tool = "GoogleSearch"
+        else:
+            tool = "DocumentSearch"
+
+        return (
+            f"Thought: I should use {tool} to answer this\n"
+            f"Action: {tool}\n"
+            f"Action Input: {question}"
+        )
+
+
+class FakeGeminiEmbeddings(HashingEmbeddings):
+    """
+    Local hashed n-gram embeddings (see embedding_backends.py) posing as Gemini
+
+    Accepts the same constructor arguments as GoogleGenerativeAIEmbeddings.
+    """
+
+    def __init__(self, model: str = "fake-embedding", google_api_key: Any = None, **kwargs):
+        super().__init__(dimension=EMBEDDING_DIM)
+        self.model = model
+
+    def embed_array(self, texts) -> np.ndarray:
+        if EMBEDDING_LATENCY:
+            time.sleep(EMBEDDING_LATENCY)
+        return super().embed_array(texts)
+
+
+class FakeAWSClient:
+    """Canned EC2 / S3 responses in place of a boto3 client"""
+
+    def __init__(self, latency: float = 0.0, instances: int = 5):
+        self.latency = latency
+        self.instances = instances
+
+    def describe_instances(self, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return {"Reservations": [{"Instances": [
+            {
+                "InstanceId": f"i-{n:017x}",
+                "InstanceType": "t3.medium",
+                "State": {"Name": "running"},
+                "Tags": [
+                    {"Key": "Name", "Value": f"web-{n}"},
+                    {"Key": "Environment", "Value": "prod" if n % 2 else "dev"},
+                ],
+            }
+            for n in range(self.instances)
+        ]}]}
+
+    def list_buckets(self, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return {"Buckets": [
+            {"Name": f"infra-chat-bucket-{n}", "CreationDate": datetime(2024, 1, 1)}
+            for n in range(3)
+        ]}
+
+
+def install_fake_aws(latency: float = 0.0):
+    """Point tools.cloud_search at FakeAWSClient instances"""
+    from tools import cloud_search
+    cloud_search.ec2_client = FakeAWSClient(latency)
+    cloud_search.s3_client = FakeAWSClient(latency)
+    cloud_search.AWS_CONFIGURED = True
+
+
+def install_fakes(llm_latency: float = 0.0, embedding_latency: float = 0.0):
+    """
+    Replace the Gemini classes in langchain_google_genai with the fakes
+
+    Must run before app.py, ingest.py or tools.doc_search are imported.
+
+    Args:
+        llm_latency: Seconds to sleep per LLM call
+        embedding_latency: Seconds to sleep per embedding call
+    """
+    global LLM_LATENCY, EMBEDDING_LATENCY
+    LLM_LATENCY = llm_latency
+    EMBEDDING_LATENCY = embedding_latency
+
+    import langchain_google_genai
+    langchain_google_genai.ChatGoogleGenerativeAI = FakeGeminiLLM
+    langchain_google_genai.GoogleGenerativeAIEmbeddings = FakeGeminiEmbeddings
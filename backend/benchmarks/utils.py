@@ -0,0 +1,86 @@
+"""
+Shared helpers for the benchmark scripts: timing statistics, memory usage
+and result tables.
+"""
+
+import math
+import os
+import sys
+
+
+def percentile(values, pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of numbers
+
+    Args:
+        values: Sample values (need not be sorted)
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies_s, elapsed_s: float) -> dict:
+    """Summarize request latencies (seconds) into ms percentiles and RPS"""
+    return {
+        "requests": len(latencies_s),
+        "rps": len(latencies_s) / elapsed_s if elapsed_s > 0 else 0.0,
+        "p50_ms": percentile(latencies_s, 50) * 1000,
+        "p95_ms": percentile(latencies_s, 95) * 1000,
+        "p99_ms": percentile(latencies_s, 99) * 1000,
+    }
+
+
+def current_rss_mb(pid: int = None) -> float:
+    """
+    Resident memory of a process in MB
+
+    Args:
+        pid: Process to measure (default: this one; for this process the
+            peak RSS is used where the current value is unavailable)
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if pid is not None:
+        try:
+            import psutil
+            return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+        except Exception:
+            return 0.0
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return 0.0
+
+
+def print_table(rows, columns):
+    """
+    Print a list of dicts as an aligned text table
+
+    Args:
+        rows: Result dictionaries
+        columns: (key, header, format) tuples, e.g. ("p50_ms", "p50 ms", "{:.1f}")
+    """
+    cells = [[fmt.format(row.get(key, "")) for key, _, fmt in columns] for row in rows]
+    headers = [header for _, header, _ in columns]
+    widths = [
+        max([len(headers[i])] + [len(line[i]) for line in cells])
+        for i in range(len(columns))
+    ]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for line in cells:
+        print("  ".join(c.ljust(w) for c, w in zip(line, widths)))
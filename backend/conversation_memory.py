@@ -0,0 +1,341 @@
+"""
+Conversation Memory
+Keeps per-session chat history for the AI agent so follow-up questions can
+build on earlier turns instead of starting from scratch.
+
+Each session holds:
+- the most recent question/answer turns
+- a rolling summary of older turns (kept under a token budget)
+- cached tool observations, so repeated lookups reuse earlier results
+
+Sessions live in an in-process LRU. If CONVERSATION_DB_PATH is set they are
+also written through to a local SQLite file, and every access checks the
+file for a newer copy. The production server (serve.py) runs several worker
+processes and a follow-up question can land on any of them, so set
+CONVERSATION_DB_PATH there - without it each worker only remembers the turns
+it served itself.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+
+# Configuration
+MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1500"))
+MAX_RECENT_TURNS = int(os.getenv("CONVERSATION_MAX_RECENT_TURNS", "6"))
+MAX_OBSERVATIONS = int(os.getenv("CONVERSATION_MAX_OBSERVATIONS", "20"))
+OBSERVATION_TTL_SECONDS = int(os.getenv("CONVERSATION_OBSERVATION_TTL", "300"))
+DB_PATH = os.getenv("CONVERSATION_DB_PATH", "")
+
+# Session the current request belongs to (read by the cached tool wrappers)
+current_session_id = ContextVar("current_session_id", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Shorten text to at most `limit` characters"""
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def observation_key(tool_name: str, tool_input: str) -> str:
+    """Normalize a tool call so trivially different inputs share a cache entry"""
+    normalized = re.sub(r"\s+", " ", str(tool_input)).strip().strip("\"'`").lower()
+    return f"{tool_name}:{normalized}"
+
+
+class ConversationSession:
+    """History, rolling summary and cached tool results for one session"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns = []          # [{"question": ..., "answer": ...}]
+        self.summary = []        # one line per folded turn, oldest first
+        self.observations = {}   # key -> {"tool", "input", "output", "at"}
+        self.updated_at = time.time()
+
+    def add_turn(self, question: str, answer: str):
+        """Record a finished turn and fold old turns into the summary"""
+        self.turns.append({"question": question, "answer": answer})
+        self.updated_at = time.time()
+        self._compact()
+
+    def add_observation(self, tool_name: str, tool_input: str, output: str):
+        """Cache a tool result, evicting the oldest when over the limit"""
+        key = observation_key(tool_name, tool_input)
+        self.observations.pop(key, None)
+        self.observations[key] = {
+            "tool": tool_name,
+            "input": str(tool_input),
+            "output": output,
+            "at": time.time()
+        }
+        while len(self.observations) > MAX_OBSERVATIONS:
+            self.observations.pop(next(iter(self.observations)))
+        self.updated_at = time.time()
+
+    def get_observation(self, tool_name: str, tool_input: str):
+        """Return a cached tool result if it is still fresh"""
+        entry = self.observations.get(observation_key(tool_name, tool_input))
+        if entry is None:
+            return None
+        if time.time() - entry["at"] > OBSERVATION_TTL_SECONDS:
+            return None
+        return entry["output"]
+
+    def _compact(self):
+        """Keep recent turns verbatim and summarize the rest under the budget"""
+        while len(self.turns) > MAX_RECENT_TURNS or (
+            len(self.turns) > 1 and self._turns_tokens() > TOKEN_BUDGET // 2
+        ):
+            oldest = self.turns.pop(0)
+            self.summary.append(
+                f"- Asked: {_truncate(oldest['question'], 120)} "
+                f"-> Answered: {_truncate(oldest['answer'], 200)}"
+            )
+
+        # The summary gets a quarter of the budget; drop its oldest lines first
+        while self.summary and estimate_tokens("\n".join(self.summary)) > TOKEN_BUDGET // 4:
+            self.summary.pop(0)
+
+    def _turns_tokens(self) -> int:
+        return sum(
+            estimate_tokens(turn["question"]) + estimate_tokens(turn["answer"])
+            for turn in self.turns
+        )
+
+    def render_context(self) -> str:
+        """
+        Format the session for the agent prompt
+
+        Returns:
+            Summary, recent turns and fresh tool results, within TOKEN_BUDGET
+        """
+        sections = []
+
+        if self.summary:
+            sections.append("Earlier in this conversation:\n" + "\n".join(self.summary))
+
+        if self.turns:
+            # Recent turns share half the budget; a single very long answer
+            # is shortened rather than crowding out the tool results
+            per_turn = TOKEN_BUDGET * 4 // 2 // len(self.turns)
+            recent = "\n".join(
+                f"User: {_truncate(turn['question'], max(per_turn // 4, 40))}\n"
+                f"Assistant: {_truncate(turn['answer'], max(per_turn - per_turn // 4, 40))}"
+                if estimate_tokens(turn['question'] + turn['answer']) * 4 > per_turn
+                else f"User: {turn['question']}\nAssistant: {turn['answer']}"
+                for turn in self.turns
+            )
+            sections.append("Recent messages:\n" + recent)
+
+        remaining = TOKEN_BUDGET - estimate_tokens("\n\n".join(sections))
+        now = time.time()
+        results = []
+        # Newest observations first, as many as fit in what is left of the budget
+        for entry in reversed(list(self.observations.values())):
+            if now - entry["at"] > OBSERVATION_TTL_SECONDS:
+                continue
+            line = f"[{entry['tool']}: {entry['input']}]\n{_truncate(entry['output'], 800)}"
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            results.append(line)
+            remaining -= cost
+
+        if results:
+            sections.append("Tool results already gathered:\n" + "\n\n".join(results))
+
+        return "\n\n".join(sections) if sections else "(new conversation)"
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "turns": self.turns,
+            "summary": self.summary,
+            "observations": self.observations,
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        session = cls(data["session_id"])
+        session.turns = data.get("turns", [])
+        session.summary = data.get("summary", [])
+        session.observations = data.get("observations", {})
+        session.updated_at = data.get("updated_at", time.time())
+        return session
+
+
+class ConversationStore:
+    """
+    Thread-safe LRU of conversation sessions with optional SQLite backing
+
+    Args:
+        max_sessions: How many sessions to keep in memory
+        db_path: Optional SQLite file for persistence (empty to disable)
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, db_path: str = DB_PATH):
+        self.max_sessions = max_sessions
+        self.db_path = db_path
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = None
+        self._db_pid = None
+
+    def new_session_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def get(self, session_id: str) -> ConversationSession:
+        """
+        Return the session, loading or creating it as needed
+
+        With a database, the cached copy is replaced when another worker
+        process has saved a newer one.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                stored_at = self._stored_updated_at(session_id)
+                if stored_at is None or stored_at <= session.updated_at:
+                    return session
+
+            session = self._load(session_id) or ConversationSession(session_id)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def save(self, session: ConversationSession):
+        """Write a session through to SQLite (no-op without a database)"""
+        db = self._connection()
+        if db is None:
+            return
+        with self._lock:
+            db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (session.session_id, json.dumps(session.to_dict()), session.updated_at)
+            )
+            db.commit()
+
+    def _update(self, session_id: str, change):
+        """
+        Apply `change` to the latest copy of a session and save it
+
+        With a database this is one write transaction, so workers updating
+        the same session at the same time don't overwrite each other.
+        """
+        with self._lock:
+            db = self._connection()
+            if db is not None:
+                db.execute("BEGIN IMMEDIATE")
+            try:
+                session = self.get(session_id)
+                change(session)
+                self.save(session)
+            except Exception:
+                if db is not None and db.in_transaction:
+                    db.rollback()
+                raise
+
+    def add_turn(self, session_id: str, question: str, answer: str):
+        self._update(session_id, lambda session: session.add_turn(question, answer))
+
+    def add_observation(self, session_id: str, tool_name: str, tool_input: str, output: str):
+        if not session_id:
+            return
+        self._update(session_id, lambda session: session.add_observation(tool_name, tool_input, output))
+
+    def get_observation(self, session_id: str, tool_name: str, tool_input: str):
+        if not session_id:
+            return None
+        with self._lock:
+            return self.get(session_id).get_observation(tool_name, tool_input)
+
+    def render_context(self, session_id: str) -> str:
+        with self._lock:
+            return self.get(session_id).render_context()
+
+    def _connection(self):
+        """Open the SQLite database lazily, once per process"""
+        if not self.db_path:
+            return None
+        # Connections must not be shared across a fork, so reopen per process
+        if self._db is None or self._db_pid != os.getpid():
+            with self._lock:
+                self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS sessions ("
+                    "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL)"
+                )
+                self._db.commit()
+                self._db_pid = os.getpid()
+        return self._db
+
+    def _stored_updated_at(self, session_id: str):
+        """When the database copy of a session was last saved (None without one)"""
+        db = self._connection()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _load(self, session_id: str):
+        db = self._connection()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return ConversationSession.from_dict(json.loads(row[0]))
+        except (ValueError, KeyError) as e:
+            print(f"⚠️  Could not load session {session_id}: {e}")
+            return None
+
+
+def cached_tool(store: ConversationStore, tool_name: str, func):
+    """
+    Wrap a tool function so results are cached in the current session
+
+    Args:
+        store: Conversation store holding the sessions
+        tool_name: Name of the tool (part of the cache key)
+        func: The tool function to wrap
+
+    Returns:
+        A function with the same signature that reuses earlier results
+    """
+    def run(tool_input: str) -> str:
+        session_id = current_session_id.get()
+        cached = store.get_observation(session_id, tool_name, tool_input)
+        if cached is not None:
+            print(f"♻️  Reusing earlier {tool_name} result")
+            return cached
+
+        output = func(tool_input)
+        # Don't cache failures - the next attempt may succeed
+        if isinstance(output, str) and "error" not in output.lstrip()[:40].lower():
+            store.add_observation(session_id, tool_name, tool_input, output)
+        return output
+
+    run.__name__ = getattr(func, "__name__", tool_name)
+    run.__doc__ = getattr(func, "__doc__", None)
+    return run
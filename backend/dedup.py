@@ -0,0 +1,116 @@
+"""
+Chunk Deduplication
+Collapses exact and near-duplicate chunks before they are embedded.
+
+Docs often repeat whole sections (the same troubleshooting block in several
+READMEs). Without deduplication each copy is embedded, stored and can take
+up one of the few result slots of a search.
+
+- Exact duplicates: same text after normalizing case and whitespace (SHA-1)
+- Near duplicates: 64-bit SimHash over word 3-shingles, within
+  `max_distance` bits (Hamming distance). Candidates are found with LSH
+  banding: the fingerprint is split into max_distance + 1 bands, and two
+  fingerprints that differ in at most max_distance bits must agree on at
+  least one band. Larger distances catch looser copies but make the bands
+  narrower, so more candidate pairs have to be compared.
+
+The first chunk of each group is kept; its metadata gets a `sources` list of
+every file the text appeared in.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+SIMHASH_BITS = 64
+DEFAULT_MAX_DISTANCE = 4
+SHINGLE_SIZE = 3
+
+_WORD_RE = re.compile(r"\w+")
+_BIT_POSITIONS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse whitespace"""
+    return " ".join(text.lower().split())
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash fingerprint of a text's word shingles"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64
+    )
+    # Count set bits per position across all shingles; majority vote per bit
+    bits = (hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)
+    votes = bits.sum(axis=0) * 2 > len(hashes)
+    return int(np.sum(votes.astype(np.uint64) << _BIT_POSITIONS))
+
+
+def _bands(fingerprint: int, num_bands: int):
+    width = SIMHASH_BITS // num_bands
+    mask = (1 << width) - 1
+    return [(band, (fingerprint >> (band * width)) & mask) for band in range(num_bands)]
+
+
+def _add_source(kept, duplicate):
+    sources = kept.metadata.setdefault("sources", [kept.metadata.get("source", "Unknown")])
+    source = duplicate.metadata.get("source", "Unknown")
+    if source not in sources:
+        sources.append(source)
+
+
+def deduplicate_chunks(chunks, max_distance: int = DEFAULT_MAX_DISTANCE):
+    """
+    Drop exact and near-duplicate chunks
+
+    Chunks are only compared within the same shard (metadata 'shard'), so a
+    team's shard still holds every chunk from that team's docs.
+
+    Args:
+        chunks: List of Document chunks
+        max_distance: Largest SimHash Hamming distance treated as a
+            duplicate (0 = exact duplicates only)
+
+    Returns:
+        (unique chunks, number of chunks removed)
+    """
+    num_bands = max_distance + 1
+    exact = {}          # (shard, sha1) -> kept chunk
+    buckets = {}        # (shard, band, value) -> [(fingerprint, kept chunk)]
+    unique = []
+
+    for chunk in chunks:
+        shard = chunk.metadata.get("shard")
+        digest = hashlib.sha1(normalize(chunk.page_content).encode("utf-8")).hexdigest()
+
+        kept = exact.get((shard, digest))
+        if kept is None and max_distance > 0:
+            fingerprint = simhash(chunk.page_content)
+            bands = _bands(fingerprint, num_bands)
+            for band, value in bands:
+                for other_fingerprint, other in buckets.get((shard, band, value), ()):
+                    if (fingerprint ^ other_fingerprint).bit_count() <= max_distance:
+                        kept = other
+                        break
+                if kept is not None:
+                    break
+
+        if kept is not None:
+            _add_source(kept, chunk)
+            continue
+
+        exact[(shard, digest)] = chunk
+        if max_distance > 0:
+            for band, value in bands:
+                buckets.setdefault((shard, band, value), []).append((fingerprint, chunk))
+        unique.append(chunk)
+
+    return unique, len(chunks) - len(unique)
@@ -0,0 +1,180 @@
+"""
+Embedding Backends
+Chooses the embedding model used for ingestion and for search queries.
+
+Backends:
+- google:                Gemini embeddings (models/embedding-001) - remote API call
+- hashing:               hashed word + character n-gram features, computed
+                         locally with NumPy - no model download, no network
+- sentence-transformers: a local sentence-transformers model on CPU
+                         (optional dependency, default all-MiniLM-L6-v2)
+
+ingest.py records the backend in the index manifest, and tools/doc_search.py
+uses the recorded backend for queries, so both sides always match.
+"""
+
+import os
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from lexical_index import tokenize
+
+EMBEDDING_BACKENDS = ("google", "hashing", "sentence-transformers")
+
+DEFAULT_MODELS = {
+    "google": "models/embedding-001",
+    "hashing": "hashing-512",
+    "sentence-transformers": "all-MiniLM-L6-v2",
+}
+
+# Texts embedded per batch by the local backends
+BATCH_SIZE = 256
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Feature-hashing embeddings over words and character n-grams
+
+    Deterministic and fast enough to embed large doc sets on CPU. Word
+    features keep exact identifiers close; character n-grams give some
+    tolerance to typos and word variants.
+
+    Args:
+        dimension: Size of the embedding vectors
+        ngram: Character n-gram length
+    """
+
+    # Tokens whose feature hashes are memoized (docs repeat most of their vocabulary)
+    MAX_CACHED_TOKENS = 200_000
+
+    def __init__(self, dimension: int = 512, ngram: int = 3):
+        self.dimension = dimension
+        self.ngram = ngram
+        self._token_hashes = {}
+
+    def _hashes(self, token: str) -> np.ndarray:
+        """Hashes of a token and its character n-grams"""
+        hashes = self._token_hashes.get(token)
+        if hashes is None:
+            padded = f"#{token}#"
+            features = [token] + [padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1)]
+            hashes = np.array([zlib.crc32(feature.encode("utf-8")) for feature in features], dtype=np.uint32)
+            if len(self._token_hashes) >= self.MAX_CACHED_TOKENS:
+                self._token_hashes.clear()
+            self._token_hashes[token] = hashes
+        return hashes
+
+    def embed_array(self, texts) -> np.ndarray:
+        """Embed texts into an (n, dimension) float32 array of unit vectors"""
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+
+        for start in range(0, len(texts), BATCH_SIZE):
+            rows, hashes = [], []
+            for row, text in enumerate(texts[start:start + BATCH_SIZE], start):
+                tokens = tokenize(text)
+                if not tokens:
+                    continue
+                text_hashes = np.concatenate([self._hashes(token) for token in tokens])
+                rows.append(np.full(len(text_hashes), row, dtype=np.int64))
+                hashes.append(text_hashes)
+            if not rows:
+                continue
+            hashes = np.concatenate(hashes)
+            # Low bits pick the bucket, the top bit the sign, so collisions tend to cancel out
+            signs = np.where(hashes >> 31, 1.0, -1.0).astype(np.float32)
+            np.add.at(matrix, (np.concatenate(rows), hashes % self.dimension), signs)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts):
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str):
+        return self.embed_array([text])[0].tolist()
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Local sentence-transformers model, loaded on first use
+
+    Args:
+        model: Model name or path
+        device: Torch device (default cpu)
+    """
+
+    def __init__(self, model: str = DEFAULT_MODELS["sentence-transformers"], device: str = "cpu"):
+        self.model_name = model
+        self.device = device
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "The sentence-transformers backend needs 'pip install sentence-transformers'"
+                ) from e
+            self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def embed_array(self, texts) -> np.ndarray:
+        """Embed texts into an (n, dimension) float32 array of unit vectors"""
+        return self.model.encode(
+            list(texts),
+            batch_size=BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype(np.float32)
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str):
+        return self.embed_array([text])[0].tolist()
+
+
+def get_embeddings(backend: str = None, model: str = None):
+    """
+    Create the embeddings for a backend
+
+    Args:
+        backend: One of EMBEDDING_BACKENDS (default: $EMBEDDING_BACKEND or google)
+        model: Model name (default: $EMBEDDING_MODEL or the backend's default)
+
+    Returns:
+        A LangChain Embeddings instance
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "google")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+    model = model or os.getenv("EMBEDDING_MODEL") or DEFAULT_MODELS[backend]
+
+    if backend == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(
+            model=model,
+            google_api_key=os.getenv("GOOGLE_API_KEY")
+        )
+
+    if backend == "hashing":
+        # Model names look like "hashing-512"; the number is the dimension
+        dimension = int(model.rsplit("-", 1)[-1]) if model.rsplit("-", 1)[-1].isdigit() else 512
+        return HashingEmbeddings(dimension=dimension)
+
+    return SentenceTransformerEmbeddings(model)
+
+
+def embedding_spec(backend: str = None, model: str = None) -> dict:
+    """The backend/model pair to record in the index manifest"""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "google")
+    return {
+        "backend": backend,
+        "model": model or os.getenv("EMBEDDING_MODEL") or DEFAULT_MODELS.get(backend),
+    }
@@ -0,0 +1,61 @@
+"""
+Gunicorn configuration for Infra-Chat
+Usage: gunicorn -c gunicorn.conf.py wsgi:app   (or simply: python serve.py)
+
+All settings can be overridden with INFRA_CHAT_* environment variables.
+"""
+
+import gc
+import multiprocessing
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Gunicorn reads this file before wsgi.py is imported, so load .env here -
+# otherwise the INFRA_CHAT_* and ADMISSION_* settings in it would only reach
+# the app, and the thread pool would be sized for the default limits
+load_dotenv(Path(__file__).parent / '.env')
+
+# Network
+bind = os.getenv('INFRA_CHAT_BIND', '0.0.0.0:5000')
+backlog = int(os.getenv('INFRA_CHAT_BACKLOG', '256'))
+
+# Workers - chat requests mostly wait on the LLM and AWS, so each worker
+# runs several threads: one per agent slot and queue place (see admission.py),
+# plus spare ones so health checks and 429s are answered right away
+workers = int(os.getenv('INFRA_CHAT_WORKERS', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = 'gthread'
+_admitted = int(os.getenv('ADMISSION_MAX_RUNNING', '4')) + int(os.getenv('ADMISSION_MAX_QUEUE', '8'))
+threads = int(os.getenv('INFRA_CHAT_THREADS', str(_admitted + 2)))
+
+# Timeouts - agent runs can take a while (several LLM + tool calls)
+timeout = int(os.getenv('INFRA_CHAT_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('INFRA_CHAT_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('INFRA_CHAT_KEEPALIVE', '5'))
+
+# Recycle workers now and then to bound any slow memory growth
+max_requests = int(os.getenv('INFRA_CHAT_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('INFRA_CHAT_MAX_REQUESTS_JITTER', '100'))
+
+# Load the app (and the FAISS / docs indexes) once in the master, before
+# forking, so workers share those pages copy-on-write
+preload_app = True
+
+# Logging
+accesslog = os.getenv('INFRA_CHAT_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('INFRA_CHAT_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before workers fork"""
+    # Move everything loaded so far out of the GC's reach; otherwise the
+    # collector touching object headers in each worker un-shares the pages
+    gc.freeze()
+    if workers > 1 and not os.getenv('CONVERSATION_DB_PATH'):
+        server.log.warning(
+            "CONVERSATION_DB_PATH is not set: each worker keeps its own chat sessions, "
+            "so follow-up questions may lose their history"
+        )
+    server.log.info(f"🚀 Infra-Chat ready: {workers} workers x {threads} threads on {bind}")
@@ -0,0 +1,286 @@
+"""
+Outbound Connections
+Shared connection pools, timeouts, retries and circuit breakers for the
+calls the tools make to outside services (web search API, AWS).
+
+- get_session(): a keep-alive requests.Session per process, so repeated
+  search API calls reuse TCP/TLS connections instead of handshaking each time.
+  With public_only=True it refuses to connect to non-public addresses
+- aws_config(): botocore settings for the boto3 clients (pool size,
+  timeouts, adaptive retries)
+- circuit_breaker(name): stops calling a service that keeps failing and
+  fails fast until it has had time to recover
+"""
+
+import ipaddress
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Configuration
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# (connect, read) timeout for requests calls
+HTTP_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_sessions = {}      # (retries, public_only) -> (pid, session)
+_session_lock = threading.Lock()
+
+
+def is_public_address(address: str) -> bool:
+    """Whether an IP address is publicly routable (not private, loopback, link-local, ...)"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    return ip.is_global and not ip.is_multicast
+
+
+class _PublicOnlyMixin:
+    """Checks the address a connection actually reached, before sending anything"""
+
+    def _new_conn(self):
+        sock = super()._new_conn()
+        address = sock.getpeername()[0]
+        if not is_public_address(address):
+            sock.close()
+            raise ValueError(f"{self.host} connected to non-public address {address}")
+        return sock
+
+
+class _PublicHTTPConnection(_PublicOnlyMixin, HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicOnlyMixin, HTTPSConnection):
+    pass
+
+
+class _PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+
+class _PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+
+class _PublicOnlyAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections only reach public addresses
+
+    The check runs on the connected socket, so a host whose DNS answer
+    changes between an earlier check and the request (DNS rebinding) can't
+    point it at internal services.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _PublicHTTPConnectionPool,
+            "https": _PublicHTTPSConnectionPool,
+        }
+
+
+def get_session(retries: bool = True, public_only: bool = False) -> requests.Session:
+    """
+    A shared keep-alive HTTP session for this process
+
+    Recreated after a fork, since pooled sockets must not be shared
+    between worker processes.
+
+    Args:
+        retries: Retry connection errors and 429/5xx responses with backoff
+            (for APIs we rely on; off for one-off fetches of third-party pages)
+        public_only: Refuse connections to private, loopback, link-local and
+            other non-public addresses (for URLs we don't control). Proxies
+            from the environment are not used, since the check would only
+            see the proxy's address
+    """
+    key = (retries, public_only)
+    pid, session = _sessions.get(key, (None, None))
+    if session is None or pid != os.getpid():
+        with _session_lock:
+            pid, session = _sessions.get(key, (None, None))
+            if session is None or pid != os.getpid():
+                retry = Retry(
+                    total=HTTP_MAX_RETRIES,
+                    backoff_factor=0.3,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=("GET", "HEAD"),
+                    respect_retry_after_header=True,
+                    # Hand back the last error response, so raise_for_status()
+                    # raises an HTTPError with its status code
+                    raise_on_status=False
+                ) if retries else Retry(total=0, redirect=0, raise_on_status=False)
+                adapter = (_PublicOnlyAdapter if public_only else HTTPAdapter)(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    max_retries=retry
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                if public_only:
+                    session.trust_env = False
+                _sessions[key] = (os.getpid(), session)
+    return session
+
+
+def aws_config():
+    """botocore Config for boto3 clients: pool size, timeouts and retries"""
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": "adaptive"},
+        tcp_keepalive=True
+    )
+
+
+def is_transient_http_error(error: Exception) -> bool:
+    """Errors that say the service is unavailable (not that the request was wrong)"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.RetryError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return False
+
+
+# A query string, after a full URL or a bare path ("... with url: /x?key=...")
+_QUERY_STRING_RE = re.compile(r"\?[^\s'\"]+")
+
+
+def safe_error_message(error: Exception) -> str:
+    """
+    Error text with URL query strings removed
+
+    requests and urllib3 put the URL - or just its path and query - in their
+    messages, and query strings can carry API keys. Strip them before the
+    text reaches logs, the LLM or users.
+    """
+    return _QUERY_STRING_RE.sub("", str(error))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"{name} is temporarily unavailable (retry in {retry_in:.0f}s)")
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated failures of a service
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls raise CircuitOpenError for `reset_seconds`. Then one trial call is
+    let through: success closes the circuit, failure opens it again.
+
+    Args:
+        name: Service name (used in error messages)
+        failure_threshold: Consecutive failures before opening
+        reset_seconds: How long to stay open
+        is_failure: Predicate deciding which exceptions count as failures
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure or (lambda error: True)
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def call(self, func, *args, **kwargs):
+        """Call func through the breaker"""
+        with self._lock:
+            if self._opened_at is not None:
+                waited = time.monotonic() - self._opened_at
+                if waited < self.reset_seconds or self._trial_running:
+                    raise CircuitOpenError(self.name, max(0.0, self.reset_seconds - waited))
+                self._trial_running = True
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not self.is_failure(e):
+                # The service answered - the request itself was the problem
+                self._record_success()
+                raise
+            with self._lock:
+                self._trial_running = False
+                self._failures += 1
+                if self._opened_at is not None or self._failures >= self.failure_threshold:
+                    if self._opened_at is None:
+                        print(f"🔌 Circuit for {self.name} opened after {self._failures} failures")
+                    self._opened_at = time.monotonic()
+            raise
+
+        self._record_success()
+        return result
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(name: str, is_failure=None) -> CircuitBreaker:
+    """The shared circuit breaker for a service, created on first use"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, is_failure=is_failure)
+        return _breakers[name]
+
+
+# Test function
+if __name__ == "__main__":
+    secret = "?key=SECRET&cx=engine&q=test"
+    errors = [
+        requests.ConnectionError(
+            f"HTTPConnectionPool(host='127.0.0.1', port=1): Max retries exceeded with url: /x{secret} "
+            "(Caused by NewConnectionError('Connection refused'))"
+        ),
+        requests.Timeout(f"HTTPSConnectionPool(host='example.com', port=443): Read timed out. (url: /v1{secret})"),
+        requests.HTTPError(f"503 Server Error: Service Unavailable for url: https://example.com/v1{secret}"),
+        requests.exceptions.RetryError(f"Max retries exceeded with url: '/v1{secret}'"),
+    ]
+    for error in errors:
+        message = safe_error_message(error)
+        assert "SECRET" not in message and "?" not in message, message
+        print(f"✅ {type(error).__name__}: {message}")
@@ -8,14 +8,20 @@ It splits documents into chunks, creates embeddings, and stores them for RAG.
 import warnings
 warnings.filterwarnings('ignore', category=RuntimeWarning, module='numpy')
 
+import argparse
 import os
+import shutil
 from pathlib import Path
 from dotenv import load_dotenv
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 
+from dedup import DEFAULT_MAX_DISTANCE, deduplicate_chunks
+from embedding_backends import EMBEDDING_BACKENDS, embedding_spec, get_embeddings
+from lexical_index import BM25Index
+from retrieval import FILE_TYPES, SHARDS_DIR, shard_name
+from vector_index import DEFAULT_PARAMS, INDEX_TYPES, build_vector_store, save_index_config
+
 # Load environment variables
 load_dotenv()
 
@@ -24,6 +30,8 @@ DOCS_DIR = Path("./docs")
 FAISS_INDEX_PATH = "./faiss_index"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "google")
 
 
 def load_documents_from_directory(docs_dir: Path):
@@ -43,7 +51,7 @@ def load_documents_from_directory(docs_dir: Path):
         return documents
     
     # Find all markdown and text files
-    file_patterns = ["*.md", "*.txt"]
+    file_patterns = [f"*{file_type}" for file_type in FILE_TYPES]
     
     for pattern in file_patterns:
         for file_path in docs_dir.rglob(pattern):
@@ -52,12 +60,14 @@ def load_documents_from_directory(docs_dir: Path):
                     content = f.read()
                     
                     # Create a Document object with metadata
+                    source = str(file_path.relative_to(docs_dir))
                     doc = Document(
                         page_content=content,
                         metadata={
-                            "source": str(file_path.relative_to(docs_dir)),
+                            "source": source,
                             "file_name": file_path.name,
-                            "file_type": file_path.suffix
+                            "file_type": file_path.suffix,
+                            "shard": shard_name(source)
                         }
                     )
                     documents.append(doc)
@@ -92,40 +102,121 @@ def split_documents(documents):
     return chunks
 
 
-def create_vector_store(chunks):
+def create_vector_store(chunks, index_type: str = FAISS_INDEX_TYPE, sharded: bool = True,
+                        embedding_backend: str = EMBEDDING_BACKEND, **index_params):
     """
     Create embeddings and store in FAISS
     
+    With sharding, every top-level docs directory (team / service) gets its
+    own FAISS + BM25 index under faiss_index/shards/, so searches can be
+    restricted to the relevant shards.
+    
     Args:
         chunks: List of document chunks
+        index_type: FAISS index type (flat, ivf, hnsw or pq)
+        sharded: Build one index per top-level docs directory
+        embedding_backend: google, hashing or sentence-transformers
+        **index_params: Index tuning parameters (nlist, nprobe, hnsw_m, ...)
         
     Returns:
-        FAISS vector store instance
+        Dictionary of shard name -> FAISS vector store
     """
-    # Initialize embeddings with Google Gemini
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
+    # Initialize embeddings (Gemini by default, or a local model)
+    spec = embedding_spec(embedding_backend)
+    embeddings = get_embeddings(**spec)
     
-    # Create FAISS index from documents
-    vectorstore = FAISS.from_documents(
-        documents=chunks,
-        embedding=embeddings
-    )
+    # Group the chunks by shard
+    groups = {}
+    for chunk in chunks:
+        name = chunk.metadata.get("shard", "general") if sharded else "all"
+        groups.setdefault(name, []).append(chunk)
+    
+    # Build into a fresh directory next to the index and swap it in at the
+    # end, so a failed run (e.g. an embedding quota error) keeps the working
+    # index - and a successful one leaves no stale shards behind
+    build_path = f"{FAISS_INDEX_PATH}.building-{os.getpid()}"
+    shutil.rmtree(build_path, ignore_errors=True)
+    try:
+        vectorstores = _build_shards(groups, build_path, spec, embeddings, index_type, **index_params)
+    except BaseException:
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise
+    _replace_index(build_path, FAISS_INDEX_PATH)
+    
+    return vectorstores
+
+
+def _build_shards(groups: dict, index_path: str, spec: dict, embeddings, index_type: str, **index_params):
+    """Build and save every shard plus the manifest under index_path"""
+    vectorstores = {}
+    # Queries must be embedded the same way, so the manifest records the model
+    manifest = {"embedding": spec, "shards": {}}
+    for name, shard_chunks in sorted(groups.items()):
+        shard_path = str(Path(index_path) / SHARDS_DIR / name)
+        
+        # Create FAISS index from documents
+        vectorstore, config = build_vector_store(shard_chunks, embeddings, index_type, **index_params)
+        
+        # Save to disk, with the index settings next to it
+        vectorstore.save_local(shard_path)
+        save_index_config(shard_path, config)
+        
+        # Keyword index over the same chunks, keyed by the same docstore ids
+        doc_ids = list(vectorstore.index_to_docstore_id.values())
+        bm25 = BM25Index(doc_ids, [vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids])
+        bm25.save(shard_path)
+        
+        print(f"🗂️  Shard '{name}': {config['index_type']} index, {config['num_vectors']} vectors, "
+              f"{len(bm25.postings)} keyword terms")
+        vectorstores[name] = vectorstore
+        manifest["shards"][name] = config
     
-    # Save to disk
-    vectorstore.save_local(FAISS_INDEX_PATH)
+    # Top-level manifest listing the shards
+    save_index_config(index_path, manifest)
     
-    return vectorstore
+    return vectorstores
+
+
+def _replace_index(build_path: str, index_path: str):
+    """Swap a finished index directory in place of the current one"""
+    old_path = f"{index_path}.old-{os.getpid()}"
+    if os.path.exists(index_path):
+        # Directories can't be replaced in one step; the gap is two renames
+        os.replace(index_path, old_path)
+    os.replace(build_path, index_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def parse_args():
+    """Command line options for the FAISS index"""
+    parser = argparse.ArgumentParser(description="Ingest documentation into FAISS")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=FAISS_INDEX_TYPE,
+                        help="FAISS index type (default: flat, or $FAISS_INDEX_TYPE)")
+    parser.add_argument("--nlist", type=int, help=f"IVF/PQ clusters (default {DEFAULT_PARAMS['nlist']})")
+    parser.add_argument("--nprobe", type=int, help=f"IVF/PQ clusters searched per query (default {DEFAULT_PARAMS['nprobe']})")
+    parser.add_argument("--hnsw-m", type=int, help=f"HNSW neighbours per node (default {DEFAULT_PARAMS['hnsw_m']})")
+    parser.add_argument("--ef-construction", type=int, help=f"HNSW build depth (default {DEFAULT_PARAMS['ef_construction']})")
+    parser.add_argument("--ef-search", type=int, help=f"HNSW query depth (default {DEFAULT_PARAMS['ef_search']})")
+    parser.add_argument("--pq-m", type=int, help=f"PQ bytes per vector (default {DEFAULT_PARAMS['pq_m']})")
+    parser.add_argument("--embedding-backend", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND,
+                        help="Embedding model (default: google, or $EMBEDDING_BACKEND)")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Keep duplicate chunks instead of collapsing them")
+    parser.add_argument("--dedup-distance", type=int, default=DEFAULT_MAX_DISTANCE,
+                        help=f"SimHash bits two chunks may differ by and still count as duplicates "
+                             f"(default {DEFAULT_MAX_DISTANCE}, 0 = exact duplicates only)")
+    parser.add_argument("--no-shards", action="store_true",
+                        help="Build a single index instead of one per top-level docs directory")
+    return parser.parse_args()
 
 
 def main():
     """Main ingestion pipeline"""
+    args = parse_args()
     print("🚀 Starting Document Ingestion...\n")
     
     # Check for API key
-    if not os.getenv('GOOGLE_API_KEY'):
+    if args.embedding_backend == "google" and not os.getenv('GOOGLE_API_KEY'):
         print("❌ Error: GOOGLE_API_KEY not found!")
         print("📝 Please copy .env.example to .env and add your API key")
         print("🔑 Get a free key: https://makersuite.google.com/app/apikey")
@@ -146,13 +237,29 @@ def main():
     print("✂️  Splitting documents into chunks...\n")
     chunks = split_documents(documents)
     
-    # Step 3: Create embeddings and store
+    # Step 3: Collapse duplicated sections (one vector, several sources)
+    if not args.no_dedup:
+        chunks, removed = deduplicate_chunks(chunks, max_distance=args.dedup_distance)
+        print(f"🧹 Collapsed {removed} duplicate chunks ({len(chunks)} unique)")
+    
+    # Step 4: Create embeddings and store
     print("\n🧠 Creating embeddings and storing in FAISS...")
     print("⏳ This may take a moment...\n")
     
-    vectorstore = create_vector_store(chunks)
+    vectorstores = create_vector_store(
+        chunks,
+        index_type=args.index_type,
+        sharded=not args.no_shards,
+        embedding_backend=args.embedding_backend,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search,
+        pq_m=args.pq_m
+    )
     
-    print(f"\n🎉 Success! Ingested {len(chunks)} chunks into FAISS")
+    print(f"\n🎉 Success! Ingested {len(chunks)} chunks into FAISS ({len(vectorstores)} shard(s))")
     print(f"💾 Database stored at: {FAISS_INDEX_PATH}")
     print("\n✅ You can now run 'python app.py' to start the chat API!")
 
@@ -0,0 +1,141 @@
+"""
+Lexical Index (BM25)
+Keyword index built alongside the FAISS index. It catches exact identifiers
+that vector search tends to miss - error codes, instance IDs, CLI flags -
+and is fused with the vector results in retrieval.py.
+"""
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+BM25_FILE = "bm25.json"
+
+# Identifiers like "ERR-4821", "i-0abc123", "aws_access_key_id" or "v1.2.3"
+# stay whole; their parts are indexed too so partial matches still score
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_./:]")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it my of on or "
+    "the this to what when where which why with".split()
+)
+
+
+def tokenize(text: str):
+    """Lowercase terms, keeping compound identifiers and their parts"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOP_WORDS:
+            continue
+        tokens.append(token)
+        if _SPLIT_RE.search(token):
+            tokens.extend(part for part in _SPLIT_RE.split(token) if part and part not in STOP_WORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of documents
+
+    Args:
+        doc_ids: Identifier for each document (the FAISS docstore ids)
+        texts: Document texts, in the same order
+        k1: Term frequency saturation
+        b: Length normalization
+    """
+
+    def __init__(self, doc_ids=None, texts=None, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self.doc_lengths = []
+        self.postings = defaultdict(list)   # term -> [[doc_index, term_frequency], ...]
+        for doc_id, text in zip(doc_ids or [], texts or []):
+            self.add(doc_id, text)
+
+    def add(self, doc_id: str, text: str):
+        """Index one more document"""
+        doc_index = len(self.doc_ids)
+        terms = Counter(tokenize(text))
+        self.doc_ids.append(doc_id)
+        self.doc_lengths.append(sum(terms.values()))
+        for term, frequency in terms.items():
+            self.postings[term].append([doc_index, frequency])
+
+    def term_stats(self, terms):
+        """(document count, total length, {term: document frequency}) for these terms"""
+        return (
+            len(self.doc_ids),
+            sum(self.doc_lengths),
+            {term: len(self.postings.get(term, ())) for term in terms},
+        )
+
+    def search(self, query: str, k: int = 10, corpus_stats=None, allowed=None):
+        """
+        Rank documents for a query
+
+        Args:
+            query: Search text
+            k: Number of results
+            corpus_stats: Optional (num_docs, avg_length, {term: doc_freq})
+                over a larger corpus, so scores from several indexes
+                (shards) are comparable; defaults to this index's own
+            allowed: Optional set of doc ids to restrict the results to
+
+        Returns:
+            List of (doc_id, score), best first
+        """
+        if not self.doc_ids:
+            return []
+        # Unique terms in query order, so tied scores always break the same way
+        terms = list(dict.fromkeys(tokenize(query)))
+        if corpus_stats is None:
+            num_docs, total_length, doc_freqs = self.term_stats(terms)
+            corpus_stats = (num_docs, total_length / num_docs, doc_freqs)
+        num_docs, avg_length, doc_freqs = corpus_stats
+        if allowed is not None:
+            allowed = {doc_index for doc_index, doc_id in enumerate(self.doc_ids) if doc_id in allowed}
+
+        scores = defaultdict(float)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            doc_freq = doc_freqs.get(term, len(postings))
+            idf = math.log(1 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            for doc_index, frequency in postings:
+                if allowed is not None and doc_index not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / avg_length)
+                scores[doc_index] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[doc_index], score) for doc_index, score in best]
+
+    def save(self, index_path: str):
+        """Write the index next to the FAISS index"""
+        with open(Path(index_path) / BM25_FILE, 'w', encoding='utf-8') as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "doc_ids": self.doc_ids,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, index_path: str):
+        """Load a saved index, or return None if there is none"""
+        path = Path(index_path) / BM25_FILE
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.doc_ids = data["doc_ids"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = defaultdict(list, data["postings"])
+        return index
@@ -0,0 +1,431 @@
+"""
+Retrieval
+Ranking logic behind the DocumentSearch tool.
+
+The index is split into shards, one per top-level docs directory (team or
+service). A search:
+1. picks the shards allowed by the filters
+2. searches them in parallel - FAISS vector search with a single shared
+   query embedding, plus the BM25 keyword index of each shard. File type
+   and source filters restrict both searches up front, so a filter never
+   hides matches that would have ranked below the candidate cut-off
+3. fuses the vector and keyword rankings with reciprocal rank fusion (RRF)
+4. reranks the top `fetch_k` candidates - by default with maximal marginal
+   relevance (MMR), so near-identical chunks don't fill every result slot
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from lexical_index import BM25Index, tokenize
+from vector_index import apply_search_params, load_index_config
+
+# Constant from the RRF paper; dampens the weight of top ranks
+RRF_K = 60
+
+# Candidates taken from each ranker before fusing
+CANDIDATES_PER_RANKER = 20
+
+# Where ingest.py writes one sub-index per shard
+SHARDS_DIR = "shards"
+
+# Document file types ingest.py loads (the values of the 'file_type' filter)
+FILE_TYPES = (".md", ".txt")
+
+# Candidates handed to the reranker, and MMR's relevance/diversity trade-off
+# (1.0 = relevance only, 0.0 = diversity only). 0.8 keeps recall@3 at or
+# above the fused ranking in benchmarks/bench_retrieval.py; 0.5 lost several
+# points there. Exact duplicates are already removed at ingest (dedup.py), so
+# MMR only has to split up near-identical chunks.
+FETCH_K = int(os.getenv("DOC_SEARCH_FETCH_K", "20"))
+MMR_LAMBDA = float(os.getenv("DOC_SEARCH_MMR_LAMBDA", "0.8"))
+
+# Filtered searches over at most this many chunks compare the query with
+# each matching vector directly (exact); larger ones use a FAISS id selector
+EXACT_FILTER_LIMIT = 4096
+
+# Filter results remembered per shard (the docstore doesn't change once loaded)
+MAX_CACHED_FILTERS = 64
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+
+class Shard:
+    """One independently searchable part of the index"""
+
+    def __init__(self, name: str, vectorstore, bm25=None):
+        self.name = name
+        self.vectorstore = vectorstore
+        self.bm25 = bm25
+        self._positions = None
+        self._filtered = {}
+
+    def matching(self, filters: dict):
+        """
+        FAISS positions and doc ids of the chunks matching the file type /
+        source filters
+
+        Returns:
+            (positions array, set of doc ids)
+        """
+        key = (filters.get("file_type"), filters.get("source"))
+        if key not in self._filtered:
+            positions, doc_ids = [], set()
+            for position, doc_id in self.vectorstore.index_to_docstore_id.items():
+                if matches_filters(self.document(doc_id), filters):
+                    positions.append(position)
+                    doc_ids.add(doc_id)
+            if len(self._filtered) >= MAX_CACHED_FILTERS:
+                self._filtered.pop(next(iter(self._filtered)))
+            self._filtered[key] = (np.asarray(positions, dtype=np.int64), doc_ids)
+        return self._filtered[key]
+
+    def vector_hits(self, embedding, k: int, positions=None):
+        """
+        (key, distance) pairs for the nearest chunks, closest first
+
+        Args:
+            embedding: Query embedding, shape (1, dim)
+            k: Number of chunks
+            positions: Optional FAISS positions to restrict the search to
+        """
+        index = self.vectorstore.index
+        if positions is None:
+            distances, indices = index.search(embedding, k)
+        elif len(positions) == 0:
+            return []
+        else:
+            distances, indices = self._filtered_search(embedding, k, positions)
+        return [
+            ((self.name, self.vectorstore.index_to_docstore_id[i]), float(distance))
+            for distance, i in zip(distances[0], indices[0])
+            if i != -1
+        ]
+
+    def _filtered_search(self, embedding, k: int, positions):
+        index = self.vectorstore.index
+        if len(positions) <= EXACT_FILTER_LIMIT:
+            try:
+                # Small subset: exact squared L2 distances to the stored vectors
+                vectors = index.reconstruct_batch(positions)
+                all_distances = ((vectors - embedding[0]) ** 2).sum(axis=1)
+                order = np.argsort(all_distances)[:k]
+                return all_distances[order][None, :], positions[order][None, :]
+            except RuntimeError:
+                pass  # index can't return stored vectors - use the selector
+        return index.search(embedding, k, params=_selector_params(index, positions))
+
+    def lexical_hits(self, query: str, k: int, corpus_stats=None, allowed=None):
+        """(key, score) pairs from the BM25 index, best first"""
+        if self.bm25 is None:
+            return []
+        return [
+            ((self.name, doc_id), score)
+            for doc_id, score in self.bm25.search(query, k, corpus_stats, allowed)
+        ]
+
+    def document(self, doc_id: str):
+        return self.vectorstore.docstore.search(doc_id)
+
+    def vectors(self, doc_ids):
+        """Stored vectors of these chunks, read back from the FAISS index"""
+        if self._positions is None:
+            self._positions = {
+                doc_id: position
+                for position, doc_id in self.vectorstore.index_to_docstore_id.items()
+            }
+        positions = np.asarray([self._positions[doc_id] for doc_id in doc_ids], dtype=np.int64)
+        return self.vectorstore.index.reconstruct_batch(positions)
+
+
+def _selector_params(index, positions):
+    """FAISS search parameters limiting a search to these positions"""
+    import faiss
+
+    selector = faiss.IDSelectorBatch(positions)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def shard_name(source: str) -> str:
+    """Shard for a document: its top-level docs directory, or 'general'"""
+    parts = Path(source).parts
+    return parts[0] if len(parts) > 1 else "general"
+
+
+def _load_shard(name: str, path: str, embeddings):
+    from langchain_community.vectorstores import FAISS
+
+    vectorstore = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+
+    # Apply the search settings the index was built with (nprobe / efSearch),
+    # optionally overridden from the environment
+    config = load_index_config(path)
+    for param, env_var in (("nprobe", "FAISS_NPROBE"), ("ef_search", "FAISS_EF_SEARCH")):
+        if os.getenv(env_var):
+            config.setdefault("params", {})[param] = int(os.getenv(env_var))
+    apply_search_params(vectorstore.index, config)
+
+    try:
+        bm25 = BM25Index.load(path)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not load BM25 index for '{name}' ({e}). Using vector search only.")
+        bm25 = None
+
+    return Shard(name, vectorstore, bm25)
+
+
+def load_index(index_path: str, embeddings):
+    """
+    Load every shard written by ingest.py
+
+    Indexes from before sharding (a single FAISS index at the top level)
+    load as one shard named 'all'.
+
+    Args:
+        index_path: The FAISS index directory
+        embeddings: Embeddings used to embed queries
+
+    Returns:
+        Dictionary of shard name -> Shard
+    """
+    manifest = load_index_config(index_path)
+    if "shards" not in manifest:
+        return {"all": _load_shard("all", index_path, embeddings)}
+
+    return {
+        name: _load_shard(name, str(Path(index_path) / SHARDS_DIR / name), embeddings)
+        for name in manifest["shards"]
+    }
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K, with_scores: bool = False):
+    """
+    Fuse several ranked id lists into one
+
+    Args:
+        rankings: Lists of ids, each best first
+        k: RRF constant
+        with_scores: Return (id, score) pairs instead of bare ids
+
+    Returns:
+        Ids sorted by fused score, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [(doc_id, scores[doc_id]) for doc_id in ranked] if with_scores else ranked
+
+
+def mmr_rerank(query_vector, vectors, relevance, k: int, lambda_mult: float = MMR_LAMBDA):
+    """
+    Maximal marginal relevance: pick chunks that are relevant but unlike
+    the ones already picked
+
+    Args:
+        query_vector: Query embedding, shape (dim,)
+        vectors: Candidate embeddings, shape (n, dim)
+        relevance: Candidate relevance in [0, 1], shape (n,)
+        k: Number of candidates to pick
+        lambda_mult: Weight of relevance against diversity
+
+    Returns:
+        Indices into the candidates, in pick order
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    unit = vectors / norms
+    similarity = unit @ unit.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    while len(selected) < min(k, len(vectors)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
+
+
+# Rerankers: name -> function(query_vector, vectors, relevance, k) -> indices
+RERANKERS = {
+    "mmr": mmr_rerank,
+}
+
+
+def register_reranker(name: str, reranker):
+    """
+    Make a reranker available to search_index / DOC_SEARCH_RERANKER
+
+    Register before tools.doc_search is imported, which checks the
+    configured name once at import.
+    """
+    RERANKERS[name] = reranker
+
+
+def corpus_stats(shards, query: str):
+    """
+    BM25 statistics over several shards combined, so their keyword scores
+    are comparable (a tiny shard would otherwise get inflated or deflated IDFs)
+    """
+    terms = set(tokenize(query))
+    num_docs, total_length, doc_freqs = 0, 0, dict.fromkeys(terms, 0)
+    for shard in shards:
+        shard_docs, shard_length, shard_freqs = shard.bm25.term_stats(terms)
+        num_docs += shard_docs
+        total_length += shard_length
+        for term, freq in shard_freqs.items():
+            doc_freqs[term] += freq
+    return num_docs, total_length / max(num_docs, 1), doc_freqs
+
+
+def select_shards(shards: dict, filters: dict = None):
+    """Shards allowed by the 'shard' filter (all of them without one)"""
+    wanted = (filters or {}).get("shard")
+    if not wanted:
+        return list(shards.values())
+    wanted = {name.lower() for name in wanted}
+    return [shard for name, shard in shards.items() if name.lower() in wanted]
+
+
+def matches_filters(doc, filters: dict = None) -> bool:
+    """
+    Check a chunk's metadata against the 'file_type' and 'source' filters
+
+    The source filter also matches the other files a deduplicated chunk
+    appeared in (metadata 'sources').
+    """
+    if not filters:
+        return True
+    file_type = filters.get("file_type")
+    if file_type and doc.metadata.get("file_type", "").lower() != file_type.lower():
+        return False
+    source = filters.get("source")
+    if source:
+        sources = [doc.metadata.get("source", "")] + doc.metadata.get("sources", [])
+        if not any(str(name).lower().startswith(source.lower()) for name in sources):
+            return False
+    return True
+
+
+def search_index(shards: dict, query: str, k: int = 3, filters: dict = None,
+                 reranker: str = "mmr", fetch_k: int = FETCH_K):
+    """
+    Search the selected shards in parallel, fuse and rerank the results
+
+    Args:
+        shards: Dictionary of shard name -> Shard
+        query: Search text
+        k: Number of chunks to return
+        filters: Optional {"shard": [names], "file_type": ".md", "source": "prefix"}
+        reranker: Name of a reranker in RERANKERS, or None to keep fused order
+        fetch_k: Candidates passed to the reranker
+
+    Returns:
+        List of Documents, best first
+    """
+    selected = select_shards(shards, filters)
+    if not selected:
+        return []
+    candidates = max(k, fetch_k, CANDIDATES_PER_RANKER)
+
+    # File type / source filters restrict both rankers to the matching chunks
+    restricted = {
+        shard.name: shard.matching(filters)
+        for shard in selected
+        if filters and (filters.get("file_type") or filters.get("source"))
+    }
+    positions = {name: match[0] for name, match in restricted.items()}
+    allowed = {name: match[1] for name, match in restricted.items()}
+
+    # Keyword lookups don't need the embedding, so they start right away
+    lexical_shards = [shard for shard in selected if shard.bm25 is not None]
+    stats = corpus_stats(lexical_shards, query) if len(lexical_shards) > 1 else None
+    lexical_jobs = [
+        _executor.submit(shard.lexical_hits, query, candidates, stats, allowed.get(shard.name))
+        for shard in lexical_shards
+    ]
+
+    # One query embedding (usually the slow part) shared by every shard
+    embedding = np.asarray([selected[0].vectorstore._embed_query(query)], dtype=np.float32)
+    if len(selected) == 1:
+        vector_hits = selected[0].vector_hits(embedding, candidates, positions.get(selected[0].name))
+    else:
+        vector_jobs = [
+            _executor.submit(shard.vector_hits, embedding, candidates, positions.get(shard.name))
+            for shard in selected
+        ]
+        vector_hits = [hit for job in vector_jobs for hit in job.result()]
+
+    # All shards share the embedding space, so distances compare directly
+    vector_ids = [key for key, _ in sorted(vector_hits, key=lambda hit: hit[1])][:candidates]
+
+    rankings = [vector_ids]
+    if lexical_jobs:
+        lexical_hits = [hit for job in lexical_jobs for hit in job.result()]
+        rankings.append([key for key, _ in sorted(lexical_hits, key=lambda hit: hit[1], reverse=True)][:candidates])
+    ranked = reciprocal_rank_fusion(rankings, with_scores=True)
+
+    pool = []
+    for key, score in ranked:
+        doc = shards[key[0]].document(key[1])
+        if matches_filters(doc, filters):
+            pool.append((key, doc, score))
+            if len(pool) == max(k, fetch_k if reranker else k):
+                break
+
+    if not reranker or len(pool) <= k:
+        return [doc for _, doc, _ in pool[:k]]
+
+    if reranker not in RERANKERS:
+        raise ValueError(f"Unknown reranker '{reranker}' (expected one of {', '.join(RERANKERS)})")
+    order = _rerank(RERANKERS[reranker], shards, embedding[0], pool, k)
+    return [pool[i][1] for i in order]
+
+
+def _rerank(reranker, shards, query_vector, pool, k: int):
+    """Run a reranker over the candidate pool; keep the fused order if it can't run"""
+    try:
+        vectors = np.empty((len(pool), len(query_vector)), dtype=np.float32)
+        by_shard = {}
+        for i, ((name, doc_id), _, _) in enumerate(pool):
+            by_shard.setdefault(name, []).append((i, doc_id))
+        for name, items in by_shard.items():
+            vectors[[i for i, _ in items]] = shards[name].vectors([doc_id for _, doc_id in items])
+    except Exception as e:
+        print(f"⚠️  Could not read candidate vectors for reranking ({e})")
+        return list(range(k))
+
+    # Fused scores rescaled to [0, 1], comparable with cosine similarity
+    scores = np.asarray([score for _, _, score in pool], dtype=np.float32)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread else np.ones_like(scores)
+
+    return reranker(query_vector, vectors, relevance, k)[:k]
+
+
+def hybrid_search(vectorstore, bm25, query: str, k: int = 3, reranker: str = "mmr"):
+    """
+    Search a single (unsharded) FAISS store, fused with BM25 when given
+
+    Args:
+        vectorstore: LangChain FAISS store
+        bm25: BM25Index over the same chunks (None for vector-only search)
+        query: Search text
+        k: Number of chunks to return
+        reranker: Name of a reranker in RERANKERS, or None
+
+    Returns:
+        List of Documents, best first
+    """
+    return search_index({"all": Shard("all", vectorstore, bm25)}, query, k, reranker=reranker)
@@ -1,5 +1,6 @@
 """
 Wrapper script to run app.py with numpy compatibility fixes for Python 3.13
+Starts the app through serve.py (waitress on Windows, gunicorn elsewhere)
 """
 import os
 import sys
@@ -12,10 +13,10 @@ os.environ['OPENBLAS_CORETYPE'] = 'prescott'
 import warnings
 warnings.filterwarnings('ignore')
 
-# Now import and run the app
+# Now start the app under the production server
 try:
-    import app
-    # The app.py module will execute when imported
+    import serve
+    serve.main()
 except Exception as e:
     print(f"Error starting application: {e}")
     sys.exit(1)
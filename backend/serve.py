@@ -0,0 +1,64 @@
+"""
+Production Server for Infra-Chat
+Runs the backend under a multi-worker server instead of the Flask dev server.
+
+- Linux / macOS: gunicorn with the settings in gunicorn.conf.py
+- Windows: waitress (gunicorn does not run on Windows)
+
+Usage:
+    python serve.py
+    INFRA_CHAT_APP=app_minimal INFRA_CHAT_WORKERS=4 python serve.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+GUNICORN_CONFIG = str(Path(__file__).parent / 'gunicorn.conf.py')
+
+
+def run_gunicorn():
+    """Run the app under gunicorn (preloaded, multi-worker)"""
+    from gunicorn.app.wsgiapp import run
+
+    sys.argv = [sys.argv[0], '--config', GUNICORN_CONFIG, 'wsgi:app']
+    run()
+
+
+def run_waitress():
+    """Run the app under waitress (single process, thread pool)"""
+    from waitress import serve
+    from wsgi import app
+    from admission import MAX_QUEUE, MAX_RUNNING
+
+    host, _, port = os.getenv('INFRA_CHAT_BIND', '0.0.0.0:5000').rpartition(':')
+    # Admitted requests (running or queued) each hold a thread; keep spares
+    threads = int(os.getenv('INFRA_CHAT_THREADS', str(max(8, MAX_RUNNING + MAX_QUEUE + 2))))
+
+    print(f"🚀 Infra-Chat running on http://{host}:{port} (waitress, {threads} threads)")
+    serve(
+        app,
+        host=host,
+        port=int(port),
+        threads=threads,
+        channel_timeout=int(os.getenv('INFRA_CHAT_TIMEOUT', '120'))
+    )
+
+
+def main():
+    # Make 'wsgi' importable no matter where we are started from
+    os.chdir(Path(__file__).parent)
+    sys.path.insert(0, str(Path(__file__).parent))
+    # Server settings (bind address, workers, threads) may come from .env too
+    load_dotenv(Path(__file__).parent / '.env')
+
+    if os.name == 'nt':
+        run_waitress()
+    else:
+        run_gunicorn()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Shared Calls
+Deduplicates identical tool and AWS calls made by concurrent agent runs in
+one batch request.
+
+Inside a BatchScope, the first caller of a given key runs the function and
+every other caller with the same key - before or after it finishes - gets
+the same result (single flight). Outside a batch, calls run as normal.
+"""
+
+import threading
+from concurrent.futures import Future
+from contextvars import ContextVar
+
+from conversation_memory import observation_key
+
+# The batch the current agent run belongs to (None outside /api/chat/batch)
+current_batch = ContextVar("current_batch", default=None)
+
+
+class BatchScope:
+    """Results of the calls made so far within one batch"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls_made = 0
+        self.calls_shared = 0
+
+    def call(self, key, func, *args, **kwargs):
+        """Run func once per key; concurrent callers wait for the same result"""
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._calls[key] = future
+                self.calls_made += 1
+            else:
+                self.calls_shared += 1
+
+        if owner:
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def shared_call(key, func, *args, **kwargs):
+    """Call func, sharing the result with identical calls in the current batch"""
+    scope = current_batch.get()
+    if scope is None:
+        return func(*args, **kwargs)
+    return scope.call(key, func, *args, **kwargs)
+
+
+def shared_tool(tool_name: str, func):
+    """
+    Wrap a tool function so identical inputs within a batch run only once
+
+    Args:
+        tool_name: Name of the tool (part of the key)
+        func: The tool function to wrap
+
+    Returns:
+        A function with the same signature
+    """
+    def run(tool_input: str) -> str:
+        return shared_call(observation_key(tool_name, tool_input), func, tool_input)
+
+    run.__name__ = getattr(func, "__name__", tool_name)
+    run.__doc__ = getattr(func, "__doc__", None)
+    return run
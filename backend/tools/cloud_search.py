@@ -8,20 +8,26 @@ import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 import json
 
+from http_pool import aws_config, circuit_breaker
+from shared_calls import shared_call
+
 # Initialize AWS clients (with error handling)
+# Both use the shared pool size / timeout / retry settings from http_pool
 try:
     ec2_client = boto3.client(
         'ec2',
         aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
         aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
+        region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
+        config=aws_config()
     )
     
     s3_client = boto3.client(
         's3',
         aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
         aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
+        region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
+        config=aws_config()
     )
     
     AWS_CONFIGURED = True
@@ -30,6 +36,18 @@ except (NoCredentialsError, Exception) as e:
     AWS_CONFIGURED = False
 
 
+def _is_aws_outage(error: Exception) -> bool:
+    """Count throttling, 5xx and connection problems - not e.g. AccessDenied"""
+    if isinstance(error, ClientError):
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return status >= 500 or status == 429 or 'Throttl' in error.response.get('Error', {}).get('Code', '')
+    return True
+
+
+# Fail fast while AWS keeps failing instead of making every request wait
+aws_breaker = circuit_breaker("AWS", is_failure=_is_aws_outage)
+
+
 def search_aws_resources(query: str) -> str:
     """
     Query AWS resources based on user input
@@ -77,7 +95,8 @@ def search_aws_resources(query: str) -> str:
 def get_ec2_instances(query: str) -> str:
     """Get EC2 instance information"""
     try:
-        response = ec2_client.describe_instances()
+        # One DescribeInstances per batch, however each run phrased its question
+        response = shared_call("aws:ec2:describe_instances", aws_breaker.call, ec2_client.describe_instances)
         
         instances = []
         for reservation in response['Reservations']:
@@ -125,7 +144,7 @@ def get_ec2_instances(query: str) -> str:
 def get_s3_buckets() -> str:
     """Get S3 bucket information"""
     try:
-        response = s3_client.list_buckets()
+        response = shared_call("aws:s3:list_buckets", aws_breaker.call, s3_client.list_buckets)
         buckets = response['Buckets']
         
         if not buckets:
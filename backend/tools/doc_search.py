@@ -8,7 +8,11 @@ import warnings
 warnings.filterwarnings('ignore', category=RuntimeWarning, module='numpy')
 
 import os
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import re
+
+from embedding_backends import get_embeddings
+from retrieval import FILE_TYPES, RERANKERS, load_index, search_index
+from vector_index import load_index_config
 
 # Try to import FAISS, but have a fallback
 try:
@@ -20,48 +24,114 @@ except Exception as e:
 
 # Configuration
 FAISS_INDEX_PATH = "./faiss_index"
+SEARCH_K = int(os.getenv("DOC_SEARCH_K", "3"))
+# Reranker applied to the top candidates ("mmr", any registered name, or "none")
+RERANKER = os.getenv("DOC_SEARCH_RERANKER", "mmr")
+if RERANKER != "none" and RERANKER not in RERANKERS:
+    print(f"⚠️  Warning: Unknown DOC_SEARCH_RERANKER '{RERANKER}' "
+          f"(expected none or one of {', '.join(RERANKERS)}). Reranking disabled.")
+    RERANKER = "none"
+
+# Inline filters the agent can put in a query, e.g. "team:payments deploy steps".
+# Only values naming a loaded shard, a known file type or an indexed path
+# count - other "key:value" text (pasted logs, headers) stays in the query
+FILTER_PATTERN = re.compile(r"\b(team|shard|type|source):(\S+)", re.IGNORECASE)
 
-# Initialize embeddings (same as used in ingestion)
+# Initialize embeddings - the same backend and model the index was built with
 try:
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=os.getenv("GOOGLE_API_KEY")
+    embedding_config = load_index_config(FAISS_INDEX_PATH).get(
+        "embedding", {"backend": "google", "model": "models/embedding-001"}
     )
+    if os.getenv("EMBEDDING_BACKEND", embedding_config["backend"]) != embedding_config["backend"]:
+        print(f"⚠️  Warning: Index was built with '{embedding_config['backend']}' embeddings - "
+              f"using those instead of EMBEDDING_BACKEND={os.getenv('EMBEDDING_BACKEND')}")
+    embeddings = get_embeddings(embedding_config["backend"], embedding_config["model"])
 except Exception as e:
     embeddings = None
     print(f"⚠️  Warning: Could not initialize embeddings ({e})")
 
-# Load the vector store
-vectorstore = None
+# Load the index shards (FAISS + BM25 per top-level docs directory)
+shards = {}
 if FAISS_AVAILABLE and embeddings:
     try:
-        vectorstore = FAISS.load_local(
-            FAISS_INDEX_PATH,
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
+        shards = load_index(FAISS_INDEX_PATH, embeddings)
     except Exception as e:
         print(f"⚠️  Warning: Could not load FAISS index: {e}")
         print("💡 Make sure you've run 'python ingest.py' first!")
-        vectorstore = None
+        shards = {}
+
+
+def available_shards():
+    """Names of the loaded index shards (one per team / service docs directory)"""
+    return sorted(shards)
+
+
+def _known_source(prefix: str) -> bool:
+    """Whether any indexed chunk comes from a file under this path prefix"""
+    filters = {"source": prefix}
+    return any(len(shard.matching(filters)[0]) for shard in shards.values())
+
+
+def parse_filters(query: str):
+    """
+    Pull inline filters out of a query
 
+    Supported: team:<name> / shard:<name> (comma-separated for several),
+    type:<.md|.txt> and source:<path prefix>. A filter whose value matches
+    nothing in the index is left in the query as plain text.
 
-def search_documentation(query: str) -> str:
+    Returns:
+        (query without the filters, filters dictionary)
     """
-    Search through documentation using vector similarity
+    filters = {}
+    known_shards = {name.lower() for name in shards}
+
+    def take(match):
+        key, value = match.group(1).lower(), match.group(2)
+        if key in ("team", "shard"):
+            names = [v for v in value.split(",") if v]
+            if not names or any(name.lower() not in known_shards for name in names):
+                return match.group(0)
+            filters.setdefault("shard", []).extend(names)
+        elif key == "type":
+            file_type = (value if value.startswith(".") else f".{value}").lower()
+            if file_type not in FILE_TYPES:
+                return match.group(0)
+            filters["file_type"] = file_type
+        else:
+            if not _known_source(value):
+                return match.group(0)
+            filters["source"] = value
+        return ""
+
+    query = FILTER_PATTERN.sub(take, query)
+    return query.strip(), filters
+
+
+def search_documentation(query: str, filters: dict = None) -> str:
+    """
+    Search through documentation using vector similarity, fused with
+    keyword (BM25) matching when the keyword index is available
     
     Args:
-        query: The search query from the user
+        query: The search query from the user (may contain inline filters)
+        filters: Optional {"shard": [names], "file_type": ".md", "source": "prefix"}
         
     Returns:
         Relevant documentation excerpts as a formatted string
     """
-    if vectorstore is None:
+    if not shards:
         return "Error: Documentation database not initialized. Please run 'python ingest.py' first."
     
     try:
+        query, inline_filters = parse_filters(query)
+        filters = {**inline_filters, **(filters or {})}
+        
         # Search for relevant documents
-        results = vectorstore.similarity_search(query, k=3)
+        results = search_index(
+            shards, query, k=SEARCH_K, filters=filters,
+            reranker=None if RERANKER == "none" else RERANKER
+        )
         
         if not results:
             return "No relevant documentation found for your query."
@@ -69,7 +139,8 @@ def search_documentation(query: str) -> str:
         # Format the results
         formatted_results = []
         for i, doc in enumerate(results, 1):
-            source = doc.metadata.get('source', 'Unknown')
+            # Deduplicated chunks list every file the text appears in
+            source = ", ".join(doc.metadata.get('sources') or [doc.metadata.get('source', 'Unknown')])
             content = doc.page_content.strip()
             
             formatted_results.append(
@@ -1,40 +1,299 @@
 """
 Google Search Tool
 Provides web search capability for general queries
+
+With GOOGLE_SEARCH_API_KEY and GOOGLE_SEARCH_ENGINE_ID set, queries go to the
+Custom Search API (GOOGLE_SEARCH_API_URL can point at a local stand-in, see
+benchmarks/fake_search_server.py). Results are cached on disk for
+SEARCH_CACHE_TTL seconds, so asking about the same error message again is
+answered without another API call. With SEARCH_FETCH_PAGES > 0 the top
+result pages are downloaded in parallel and a text extract of each is added
+to the results. Pages are only fetched from public addresses (checked on
+every redirect, and again on the connected socket), since this host holds
+cloud credentials and can reach internal services such as the instance
+metadata endpoint.
 """
 
-import requests
+import hashlib
+import json
 import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+from http_pool import (
+    HTTP_TIMEOUT, circuit_breaker, get_session, is_public_address, is_transient_http_error, safe_error_message
+)
+
+# Configuration
+SEARCH_API_URL = os.getenv("GOOGLE_SEARCH_API_URL", "https://www.googleapis.com/customsearch/v1")
+SEARCH_NUM_RESULTS = int(os.getenv("SEARCH_NUM_RESULTS", "3"))
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", "search_cache")
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "86400"))  # 0 disables the cache
+
+# Top result pages to download and extract (0 = titles and snippets only)
+SEARCH_FETCH_PAGES = int(os.getenv("SEARCH_FETCH_PAGES", "0"))
+SEARCH_PAGE_MAX_BYTES = int(os.getenv("SEARCH_PAGE_MAX_BYTES", "500000"))
+SEARCH_PAGE_MAX_CHARS = int(os.getenv("SEARCH_PAGE_MAX_CHARS", "1500"))
+SEARCH_PAGE_MAX_REDIRECTS = 5
+# Only for local testing against benchmarks/fake_search_server.py
+SEARCH_PAGE_ALLOW_PRIVATE = os.getenv("SEARCH_PAGE_ALLOW_PRIVATE", "false").lower() == "true"
+
+PAGE_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Expired cache files are deleted at most this often (seconds)
+SEARCH_CACHE_PRUNE_INTERVAL = 3600
+
+# Fail fast while the search API keeps failing
+search_breaker = circuit_breaker("Google Search API", is_failure=is_transient_http_error)
+
+_page_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="page-fetch")
+
+
+def _get_json(url: str, params: dict) -> dict:
+    """GET over the shared keep-alive session and decode the JSON body"""
+    response = get_session().get(url, params=params, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the visible text of an HTML page"""
+
+    SKIPPED_TAGS = {"script", "style", "noscript", "head", "nav", "footer", "svg"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth and data.strip():
+            self.parts.append(data.strip())
+
+
+def extract_text(html: str, max_chars: int = SEARCH_PAGE_MAX_CHARS) -> str:
+    """Visible text of an HTML page, whitespace collapsed and truncated"""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = " ".join(" ".join(parser.parts).split())
+    return text[:max_chars] + ("..." if len(text) > max_chars else "")
+
+
+def check_public_url(url: str):
+    """
+    Make sure a URL is http(s) and its host resolves only to public addresses
+
+    Raises:
+        ValueError: For other schemes, unresolvable hosts and private,
+            loopback, link-local (e.g. 169.254.169.254) or reserved addresses
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError(f"not an http(s) URL: {parsed.scheme}://{parsed.hostname}")
+    if SEARCH_PAGE_ALLOW_PRIVATE:
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, parsed.port or 443)}
+    except socket.gaierror as e:
+        raise ValueError(f"cannot resolve {parsed.hostname} ({e})")
+    for address in addresses:
+        if not is_public_address(address):
+            raise ValueError(f"{parsed.hostname} resolves to non-public address {address}")
+
+
+def fetch_page_text(url: str) -> str:
+    """
+    Download an HTML page (at most SEARCH_PAGE_MAX_BYTES) and extract its text
+
+    Redirects are followed by hand so every hop is checked with
+    check_public_url. The host is resolved again when connecting, so the
+    session also checks the address it actually connected to - otherwise a
+    short-TTL DNS answer could pass the check and then point elsewhere.
+    Page fetches are not retried.
+
+    Returns:
+        The text extract, or "" for non-HTML pages, blocked URLs and failed downloads
+    """
+    session = get_session(retries=False, public_only=not SEARCH_PAGE_ALLOW_PRIVATE)
+    try:
+        for _ in range(SEARCH_PAGE_MAX_REDIRECTS + 1):
+            check_public_url(url)
+            response = session.get(url, timeout=HTTP_TIMEOUT, stream=True, allow_redirects=False)
+            if response.is_redirect:
+                location = response.headers.get("Location", "")
+                response.close()
+                url = urljoin(url, location)
+                continue
+            break
+        else:
+            raise ValueError("too many redirects")
+
+        with response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "").lower()
+            if not content_type.startswith(PAGE_CONTENT_TYPES):
+                return ""
+
+            body = bytearray()
+            for block in response.iter_content(chunk_size=16384):
+                body.extend(block)
+                if len(body) >= SEARCH_PAGE_MAX_BYTES:
+                    break
+            html = bytes(body[:SEARCH_PAGE_MAX_BYTES]).decode(response.encoding or "utf-8", errors="replace")
+    except Exception as e:
+        print(f"⚠️  Could not fetch {urlparse(url).hostname} ({safe_error_message(e)})")
+        return ""
+
+    return extract_text(html)
+
+
+def _cache_path(query: str) -> Path:
+    key = json.dumps([" ".join(query.lower().split()), SEARCH_NUM_RESULTS, SEARCH_FETCH_PAGES])
+    return Path(SEARCH_CACHE_DIR) / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+
+def _read_cache(query: str):
+    """Cached results for a query, or None if missing or expired"""
+    if SEARCH_CACHE_TTL <= 0:
+        return None
+    try:
+        with open(_cache_path(query), 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created", 0) > SEARCH_CACHE_TTL:
+        _remove(_cache_path(query))
+        return None
+    return entry["results"]
+
+
+def _remove(path: Path):
+    try:
+        path.unlink()
+    except OSError:
+        pass  # already gone (another worker removed it)
+
+
+_last_prune = 0.0
+
+
+def _prune_cache():
+    """Delete expired entries, including ones that are never asked for again"""
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < SEARCH_CACHE_PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    for path in Path(SEARCH_CACHE_DIR).glob("*.json"):
+        try:
+            expired = now - path.stat().st_mtime > SEARCH_CACHE_TTL
+        except OSError:
+            continue
+        if expired:
+            _remove(path)
+
+
+def _write_cache(query: str, results: list):
+    if SEARCH_CACHE_TTL <= 0:
+        return
+    path = _cache_path(query)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so concurrent readers never see a partial file
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"query": query, "created": time.time(), "results": results}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  Could not write search cache ({e})")
+    _prune_cache()
+
+
+def search_web(query: str, api_key: str, engine_id: str) -> list:
+    """
+    Query the search API and (optionally) extract the top pages
+
+    Args:
+        query: The search query
+        api_key: Custom Search API key
+        engine_id: Custom Search engine id
+
+    Returns:
+        List of {"title", "snippet", "link", "page_text"} dictionaries
+    """
+    cached = _read_cache(query)
+    if cached is not None:
+        return cached
+
+    params = {
+        'key': api_key,
+        'cx': engine_id,
+        'q': query,
+        'num': SEARCH_NUM_RESULTS
+    }
+    data = search_breaker.call(_get_json, SEARCH_API_URL, params)
+
+    results = [
+        {
+            "title": item.get("title", ""),
+            "snippet": item.get("snippet", ""),
+            "link": item.get("link", ""),
+            "page_text": "",
+        }
+        for item in data.get("items", [])[:SEARCH_NUM_RESULTS]
+    ]
+
+    # Pages download in parallel, so this costs about one page fetch
+    to_fetch = [result for result in results if result["link"]][:SEARCH_FETCH_PAGES]
+    for result, text in zip(to_fetch, _page_executor.map(fetch_page_text, [r["link"] for r in to_fetch])):
+        result["page_text"] = text
+
+    _write_cache(query, results)
+    return results
 
 
 def google_search(query: str) -> str:
     """
-    Perform a Google search (simplified version)
-    
+    Perform a Google search
+
+    Uses the Custom Search API when it is configured, otherwise returns
+    advice on where to look.
+
     Args:
         query: The search query
-        
+
     Returns:
         Search results or a helpful message
     """
-    # Note: This is a simplified implementation
-    # For production, you'd want to use the official Google Search API
-    # or a service like SerpAPI
-    
+    if os.getenv('GOOGLE_SEARCH_API_KEY') and os.getenv('GOOGLE_SEARCH_ENGINE_ID'):
+        return google_search_api(query)
+
     return f"""
     For general web searches about "{query}", I recommend:
-    
+
     1. Check the official documentation for the most accurate information
     2. Visit Stack Overflow for technical questions
     3. Consult AWS/Azure/GCP official docs for cloud-specific queries
-    
-    💡 Tip: I'm best at helping with your team's internal documentation 
-    and your live cloud infrastructure. For general questions, feel free 
+
+    💡 Tip: I'm best at helping with your team's internal documentation
+    and your live cloud infrastructure. For general questions, feel free
     to use Google directly or ask me to search our internal docs!
     """
 
 
-# Alternative: Use a real search API if you have credits
 def google_search_api(query: str) -> str:
     """
     Real Google Search implementation using Custom Search API
@@ -42,33 +301,27 @@ def google_search_api(query: str) -> str:
     """
     api_key = os.getenv('GOOGLE_SEARCH_API_KEY')
     engine_id = os.getenv('GOOGLE_SEARCH_ENGINE_ID')
-    
+
     if not api_key or not engine_id:
         return google_search(query)  # Fall back to simple version
-    
+
     try:
-        url = "https://www.googleapis.com/customsearch/v1"
-        params = {
-            'key': api_key,
-            'cx': engine_id,
-            'q': query,
-            'num': 3
-        }
-        
-        response = requests.get(url, params=params, timeout=5)
-        data = response.json()
-        
-        if 'items' not in data:
+        items = search_web(query, api_key, engine_id)
+
+        if not items:
             return "No search results found."
-        
+
         results = []
-        for item in data['items'][:3]:
-            results.append(f"• {item['title']}\n  {item['snippet']}\n  {item['link']}\n")
-        
+        for item in items:
+            result = f"• {item['title']}\n  {item['snippet']}\n  {item['link']}\n"
+            if item['page_text']:
+                result += f"  Page extract: {item['page_text']}\n"
+            results.append(result)
+
         return "Top search results:\n\n" + "\n".join(results)
-    
+
     except Exception as e:
-        return f"Search error: {str(e)}"
+        return f"Search error: {safe_error_message(e)}"
 
 
 # Test function
@@ -0,0 +1,163 @@
+"""
+Vector Index Builder
+Builds the FAISS index used for document search, with a choice of index type.
+
+Index types:
+- flat:  exact brute-force search (default, best for small doc sets)
+- ivf:   inverted file index - searches only the `nprobe` closest of
+         `nlist` clusters
+- hnsw:  graph-based search, no training needed, tuned with `hnsw_m` and
+         `ef_search`
+- pq:    IVF with product quantization - vectors are compressed to `pq_m`
+         bytes, for very large corpora
+
+The chosen type and its parameters are saved next to the index in
+index_config.json, so tools/doc_search.py can apply the same search
+settings (nprobe / efSearch) when it loads the index.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "pq")
+INDEX_CONFIG_FILE = "index_config.json"
+
+DEFAULT_PARAMS = {
+    "nlist": 1024,          # IVF / PQ: number of clusters
+    "nprobe": 16,           # IVF / PQ: clusters searched per query
+    "hnsw_m": 32,           # HNSW: neighbours per node
+    "ef_construction": 200, # HNSW: build-time search depth
+    "ef_search": 64,        # HNSW: query-time search depth
+    "pq_m": 16,             # PQ: sub-quantizers (bytes per vector)
+    "pq_bits": 8,           # PQ: bits per sub-quantizer code
+}
+
+# FAISS wants roughly this many training points per IVF cluster
+MIN_POINTS_PER_CLUSTER = 39
+
+
+def _create_index(index_type: str, dim: int, num_vectors: int, params: dict):
+    """Create an empty (untrained) FAISS index of the requested type"""
+    import faiss
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        return index
+
+    # IVF-based types: keep enough training points per cluster
+    nlist = max(1, min(params["nlist"], num_vectors // MIN_POINTS_PER_CLUSTER))
+    params["nlist"] = nlist
+    quantizer = faiss.IndexFlatL2(dim)
+
+    if index_type == "ivf":
+        return faiss.IndexIVFFlat(quantizer, dim, nlist)
+
+    # PQ: the vector dimension must split evenly into pq_m sub-vectors
+    pq_m = max(m for m in range(1, min(params["pq_m"], dim) + 1) if dim % m == 0)
+    params["pq_m"] = pq_m
+    return faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, params["pq_bits"])
+
+
+def apply_search_params(index, config: dict):
+    """
+    Apply query-time settings (nprobe / efSearch) to a loaded index, and
+    enable vector lookup by id on IVF indexes
+
+    Args:
+        index: The FAISS index
+        config: Index config as saved by save_index_config
+    """
+    import faiss
+
+    params = config.get("params", {})
+    index_type = config.get("index_type", "flat")
+
+    if index_type in ("ivf", "pq"):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = params.get("nprobe", DEFAULT_PARAMS["nprobe"])
+        # Lets the reranker read stored vectors back (index.reconstruct)
+        ivf.make_direct_map()
+    elif index_type == "hnsw":
+        index.hnsw.efSearch = params.get("ef_search", DEFAULT_PARAMS["ef_search"])
+
+
+def build_vector_store(chunks, embeddings, index_type: str = "flat", **params):
+    """
+    Embed the chunks and build a FAISS vector store of the given type
+
+    Args:
+        chunks: List of Document chunks
+        embeddings: LangChain embeddings used for the chunks
+        index_type: One of INDEX_TYPES
+        **params: Overrides for DEFAULT_PARAMS (nlist, nprobe, hnsw_m, ...)
+
+    Returns:
+        (vectorstore, config) - the LangChain FAISS store and the index
+        config to save next to it
+    """
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}' (expected one of {', '.join(INDEX_TYPES)})")
+
+    settings = dict(DEFAULT_PARAMS)
+    settings.update({key: value for key, value in params.items() if value is not None})
+
+    texts = [chunk.page_content for chunk in chunks]
+    if hasattr(embeddings, "embed_array"):
+        # Local backends embed straight into a NumPy array
+        vectors = np.asarray(embeddings.embed_array(texts), dtype=np.float32)
+    else:
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    num_vectors, dim = vectors.shape
+
+    # Each PQ codebook has 2^bits centroids that need training points too
+    if index_type == "pq" and num_vectors < 2 ** settings["pq_bits"] * MIN_POINTS_PER_CLUSTER:
+        print(f"⚠️  Only {num_vectors} chunks - too few to train a PQ index, using 'ivf' instead")
+        index_type = "ivf"
+
+    index = _create_index(index_type, dim, num_vectors, settings)
+    if not index.is_trained:
+        print(f"🏋️  Training {index_type} index on {num_vectors} vectors...")
+        index.train(vectors)
+    index.add(vectors)
+
+    ids = [str(i) for i in range(num_vectors)]
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+        index_to_docstore_id=dict(enumerate(ids))
+    )
+
+    config = {
+        "index_type": index_type,
+        "params": settings,
+        "num_vectors": num_vectors,
+        "dimension": dim,
+    }
+    apply_search_params(index, config)
+
+    return vectorstore, config
+
+
+def save_index_config(index_path: str, config: dict):
+    """Write the index config next to the saved FAISS index"""
+    with open(Path(index_path) / INDEX_CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+
+
+def load_index_config(index_path: str) -> dict:
+    """Read the index config (indexes built before it existed are 'flat')"""
+    config_path = Path(index_path) / INDEX_CONFIG_FILE
+    if not config_path.exists():
+        return {"index_type": "flat", "params": {}}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,41 @@
+"""
+WSGI Entry Point
+Exposes the Flask app for production servers (gunicorn / waitress).
+
+Importing this module loads the selected app together with its search
+indexes. Under gunicorn (preload_app=True) that happens once in the master
+process, so forked workers share the FAISS index and docs index pages
+copy-on-write instead of each loading their own copy.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables before the app reads its configuration
+load_dotenv()
+
+# gRPC (used by the Gemini client) needs fork support when the app is
+# created in the master process and then forked into workers
+os.environ.setdefault('GRPC_ENABLE_FORK_SUPPORT', '1')
+os.environ.setdefault('GRPC_POLL_STRATEGY', 'poll')
+
+# Which app to serve: 'app' (full AI agent) or 'app_minimal' (keyword search)
+APP_MODULE = os.getenv('INFRA_CHAT_APP', 'app')
+
+if APP_MODULE == 'app_minimal':
+    from app_minimal import app
+elif APP_MODULE == 'app':
+    from app import app
+else:
+    raise ValueError(f"Unknown INFRA_CHAT_APP '{APP_MODULE}' (expected 'app' or 'app_minimal')")
+
+# Behind load balancers / reverse proxies, take the client address from
+# X-Forwarded-For (set to the number of proxies in front of the app), so
+# per-client limits apply to real clients rather than to the proxy
+PROXY_COUNT = int(os.getenv('INFRA_CHAT_PROXY_COUNT', '0'))
+if PROXY_COUNT:
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_COUNT, x_proto=PROXY_COUNT)
+
+__all__ = ['app']
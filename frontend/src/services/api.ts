@@ -3,6 +3,9 @@ import { ChatResponse } from '../types';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
 
+// Conversation session returned by the backend, sent back with follow-ups
+let sessionId: string | undefined;
+
 export const chatAPI = {
   /**
    * Send a message to the AI backend
@@ -11,7 +14,7 @@ export const chatAPI = {
     try {
       const response = await axios.post<ChatResponse>(
         `${API_URL}/api/chat`,
-        { message },
+        { message, session_id: sessionId },
         {
           headers: {
             'Content-Type': 'application/json',
@@ -20,6 +23,9 @@ export const chatAPI = {
         }
       );
       
+      if (response.data.session_id) {
+        sessionId = response.data.session_id;
+      }
       return response.data;
     } catch (error) {
       if (axios.isAxiosError(error)) {
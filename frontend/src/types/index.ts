@@ -8,5 +8,6 @@ export interface Message {
 export interface ChatResponse {
   success: boolean;
   response?: string;
+  session_id?: string;
   error?: string;
 }